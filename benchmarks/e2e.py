@@ -0,0 +1,363 @@
+"""Benchmark end-to-end ReiAssistantBot tanpa YouTube / Telegram asli.
+
+Bot dijalankan lewat jalur aslinya terhadap layanan tiruan lokal
+(benchmarks/fakes.py): link diproses yt-dlp dari situs stub, semua request
+Bot API dijawab server tiruan. Skenario:
+  - links      handle_message dengan link unik (extract, download, upload)
+  - stats      stats_command bergantian admin / user
+  - broadcast  /broadcast + konfirmasi admin ke --broadcast-users user
+
+Per tingkat concurrency dilaporkan pesan/detik, latency p50/p95/p99,
+peak RSS dan lag event loop.
+
+Jalankan dari root repo:
+    python benchmarks/e2e.py [--levels 1,10,50,100,500] [--messages 200]
+    python benchmarks/e2e.py --save baseline.json
+    python benchmarks/e2e.py --baseline baseline.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import shutil
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import StubSite, FakeBotAPI
+
+TOKEN = "123456:benchmark"
+ADMIN_ID = 1
+BROADCAST_BASE_ID = 10_000_000
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end Rei Assistant dengan layanan tiruan")
+    parser.add_argument('--levels', default='1,10,50,100,500', help="daftar concurrency, dipisah koma")
+    parser.add_argument('--messages', type=int, default=200, help="pesan per tingkat (minimal = concurrency)")
+    parser.add_argument('--scenarios', default='links,stats,broadcast', help="skenario yang dijalankan")
+    parser.add_argument('--media-size', type=int, default=256 * 1024, help="ukuran video stub (byte)")
+    parser.add_argument('--extract-latency', type=float, default=0.05, help="latency halaman video stub (detik)")
+    parser.add_argument('--download-latency', type=float, default=0.0, help="latency sebelum file video (detik)")
+    parser.add_argument('--api-latency', type=float, default=0.01, help="latency per request Bot API (detik)")
+    parser.add_argument('--broadcast-users', type=int, default=1000, help="jumlah penerima broadcast")
+    parser.add_argument('--broadcast-rate', type=float, default=25, help="BROADCAST_RATE (pesan/detik)")
+    parser.add_argument('--blocked-every', type=int, default=20, help="tiap user ke-N memblokir bot (0 = tidak ada)")
+    parser.add_argument('--log-level', default='WARNING', help="level log bot selama benchmark")
+    parser.add_argument('--save', help="simpan hasil sebagai JSON (baseline)")
+    parser.add_argument('--baseline', help="bandingkan dengan hasil JSON sebelumnya")
+    return parser.parse_args()
+
+def configure_env(args, data_dir):
+    """Config dibaca saat import: arahkan semua state ke folder sementara sebelum import bot"""
+    levels = [int(level) for level in args.levels.split(',')]
+    os.environ.update({
+        'BOT_TOKEN': TOKEN,
+        'ADMIN_ID': str(ADMIN_ID),
+        'BOT_MODE': 'polling',
+        'LOCAL_BOT_API_URL': '',
+        'ALLOW_OTHER_SITES': 'true',
+        'DATA_DIR': data_dir,
+        'SCRATCH_DIR': os.path.join(data_dir, 'scratch'),
+        'FILE_CACHE_PATH': os.path.join(data_dir, 'file_cache.db'),
+        'META_CACHE_PATH': os.path.join(data_dir, 'metadata_cache.db'),
+        'USER_DB_PATH': os.path.join(data_dir, 'users.db'),
+        'BROADCAST_DB_PATH': os.path.join(data_dir, 'broadcasts.db'),
+        'RATE_LIMIT_DB_PATH': '',
+        'RATE_LIMIT_USER_PER_MINUTE': '0',
+        'RATE_LIMIT_PLATFORMS': '',
+        'METRICS_PORT': '0',
+        'OVERSIZE_MODE': 'off',
+        'BROADCAST_RATE': str(args.broadcast_rate),
+        # Antrian cukup untuk concurrency tertinggi, penolakan tetap dihitung sebagai error
+        'DOWNLOAD_QUEUE_SIZE': os.getenv('DOWNLOAD_QUEUE_SIZE', str(max(levels) * 2)),
+    })
+    return levels
+
+def current_rss():
+    """RSS proses saat ini (byte)"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        if resource is None:
+            return 0
+        # Fallback: peak RSS sepanjang proses (KB di Linux, byte di macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+class LoopMonitor:
+    """Ukur lag event loop (keterlambatan sleep) dan peak RSS selama skenario berjalan"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.lags = []
+        self.peak_rss = 0
+        self._task = None
+
+    async def _run(self):
+        ticks = 0
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(time.perf_counter() - started - self.interval, 0))
+            ticks += 1
+            if ticks % 10 == 0:
+                self.peak_rss = max(self.peak_rss, current_rss())
+
+    def start(self):
+        self.peak_rss = current_rss()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self.peak_rss = max(self.peak_rss, current_rss())
+
+class Bench:
+    """Bot + layanan tiruan + pembuat update sintetis"""
+
+    def __init__(self, args, botmod, percentile):
+        self.args = args
+        self.percentile = percentile
+        blocked = []
+        if args.blocked_every:
+            blocked = [BROADCAST_BASE_ID + i for i in range(0, args.broadcast_users, args.blocked_every)]
+        self.site = StubSite(args.media_size, args.extract_latency, args.download_latency).start()
+        self.api = FakeBotAPI(args.api_latency, blocked).start()
+        self.bot = botmod.ReiAssistantBot()
+        # Progress download yt-dlp ke stdout tidak relevan untuk benchmark
+        self.bot.downloader.ydl_opts['noprogress'] = True
+        self.application = None
+        self._update_id = 0
+
+    async def start(self):
+        from telegram.ext import Application
+        self.application = (
+            Application.builder().token(TOKEN)
+            .base_url(f"{self.api.url}/bot")
+            .base_file_url(f"{self.api.url}/file/bot")
+            .build()
+        )
+        await self.application.initialize()
+        await self.bot.post_init(self.application)
+        # Warm-up (import extractor yt-dlp, koneksi pool) agar tidak masuk hasil concurrency pertama
+        update, context = self.update(ADMIN_ID, self.site.watch_url('warmup'))
+        await self.bot.handle_message(update, context)
+
+    async def stop(self):
+        await self.bot.post_stop(self.application)
+        await self.bot.post_shutdown(self.application)
+        await self.application.shutdown()
+        self.site.stop()
+        self.api.stop()
+
+    def _user(self, user_id):
+        return {'id': user_id, 'is_bot': False, 'first_name': f'Bench {user_id}', 'username': f'bench{user_id}'}
+
+    def _message(self, user_id, text):
+        self._update_id += 1
+        return {
+            'message_id': self._update_id,
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': self._user(user_id),
+            'text': text
+        }
+
+    def update(self, user_id, text=None, callback_data=None):
+        """Update + CallbackContext seperti yang dibuat PTB untuk handler"""
+        from telegram import Update
+        from telegram.ext import CallbackContext
+        self._update_id += 1
+        data = {'update_id': self._update_id}
+        if callback_data:
+            data['callback_query'] = {
+                'id': str(self._update_id),
+                'from': self._user(user_id),
+                'chat_instance': 'bench',
+                'data': callback_data,
+                'message': self._message(user_id, 'confirm')
+            }
+        else:
+            data['message'] = self._message(user_id, text)
+        update = Update.de_json(data, self.application.bot)
+        return update, CallbackContext.from_update(update, self.application)
+
+    def _failures(self):
+        return sum(count for (_, result, _), count in self.bot.metrics.results().items() if result == 'failure')
+
+    async def run_level(self, scenario, concurrency, count, call):
+        """Jalankan `count` panggilan dengan maksimal `concurrency` bersamaan"""
+        latencies = []
+        errors = 0
+        failures_before = self._failures()
+        slots = asyncio.Semaphore(concurrency)
+        monitor = LoopMonitor()
+
+        async def one(index):
+            nonlocal errors
+            async with slots:
+                started = time.perf_counter()
+                try:
+                    await call(index)
+                except Exception as e:
+                    errors += 1
+                    logging.getLogger(__name__).warning(f"{scenario} call failed: {e}")
+                latencies.append(time.perf_counter() - started)
+
+        monitor.start()
+        started = time.perf_counter()
+        await asyncio.gather(*(one(index) for index in range(count)))
+        elapsed = time.perf_counter() - started
+        await monitor.stop()
+
+        latencies.sort()
+        lags = sorted(monitor.lags)
+        return {
+            'scenario': scenario,
+            'concurrency': concurrency,
+            'messages': count,
+            'seconds': elapsed,
+            'rate': count / elapsed,
+            'p50': self.percentile(latencies, 50),
+            'p95': self.percentile(latencies, 95),
+            'p99': self.percentile(latencies, 99),
+            'lag_p99': self.percentile(lags, 99),
+            'lag_max': lags[-1] if lags else 0.0,
+            'rss_peak': monitor.peak_rss,
+            'errors': errors + self._failures() - failures_before,
+        }
+
+    async def links(self, concurrency, count):
+        async def call(index):
+            # User dan video unik per pesan: jalur cold (tanpa cache file_id / metadata)
+            user_id = 100_000 + concurrency * 10_000 + index
+            update, context = self.update(user_id, self.site.watch_url(f"c{concurrency}i{index}"))
+            await self.bot.handle_message(update, context)
+        return await self.run_level('links', concurrency, count, call)
+
+    async def stats(self, concurrency, count):
+        async def call(index):
+            update, context = self.update(ADMIN_ID if index % 2 == 0 else 100_000 + index, '/stats')
+            await self.bot.stats_command(update, context)
+        return await self.run_level('stats', concurrency, count, call)
+
+    async def broadcast(self):
+        """Satu broadcast lewat /broadcast + tombol konfirmasi, rate = pesan terkirim per detik"""
+        for index in range(self.args.broadcast_users):
+            self.bot.users.touch(BROADCAST_BASE_ID + index, f'bench{index}', 'Bench')
+        await self.bot.users.flush_async()
+
+        update, context = self.update(ADMIN_ID, '/broadcast Benchmark')
+        context.args = ['Benchmark']
+        await self.bot.broadcast_command(update, context)
+        broadcast_id = self.bot.broadcasts.conn.execute(
+            "SELECT MAX(id) FROM broadcasts WHERE status = 'draft'"
+        ).fetchone()[0]
+
+        monitor = LoopMonitor()
+        monitor.start()
+        started = time.perf_counter()
+        update, context = self.update(ADMIN_ID, callback_data=f"confirm_broadcast_{broadcast_id}")
+        await self.bot.callback_handler(update, context)
+        while self.bot.broadcasts.is_running(broadcast_id):
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - started
+        await monitor.stop()
+
+        job = self.bot.broadcasts.get(broadcast_id)
+        lags = sorted(monitor.lags)
+        processed = job['sent'] + job['failed'] + job['blocked']
+        return {
+            'scenario': 'broadcast',
+            'concurrency': self.bot.broadcasts.workers,
+            'messages': processed,
+            'seconds': elapsed,
+            'rate': processed / elapsed,
+            'p50': 0.0, 'p95': 0.0, 'p99': 0.0,
+            'lag_p99': self.percentile(lags, 99),
+            'lag_max': lags[-1] if lags else 0.0,
+            'rss_peak': monitor.peak_rss,
+            'errors': job['failed'],
+        }
+
+def print_results(results, baseline=None):
+    print(f"{'scenario':<10} {'conc':>5} {'msgs':>6} {'msg/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'lag p99':>8} {'lag max':>8} {'rss MB':>7} {'err':>5}")
+    previous = {(row['scenario'], row['concurrency']): row for row in baseline or []}
+    for row in results:
+        line = (
+            f"{row['scenario']:<10} {row['concurrency']:>5} {row['messages']:>6} {row['rate']:>8.1f} "
+            f"{row['p50'] * 1000:>8.0f} {row['p95'] * 1000:>8.0f} {row['p99'] * 1000:>8.0f} "
+            f"{row['lag_p99'] * 1000:>8.1f} {row['lag_max'] * 1000:>8.1f} "
+            f"{row['rss_peak'] / 1024 / 1024:>7.1f} {row['errors']:>5}"
+        )
+        old = previous.get((row['scenario'], row['concurrency']))
+        if old:
+            rate_delta = (row['rate'] / old['rate'] - 1) * 100 if old['rate'] else 0
+            p95_delta = (row['p95'] / old['p95'] - 1) * 100 if old['p95'] else 0
+            line += f"  (msg/s {rate_delta:+.0f}%, p95 {p95_delta:+.0f}%)"
+        print(line)
+
+async def run(args, levels, botmod, percentile):
+    bench = Bench(args, botmod, percentile)
+    await bench.start()
+    scenarios = args.scenarios.split(',')
+    results = []
+    try:
+        for scenario in ('links', 'stats'):
+            if scenario not in scenarios:
+                continue
+            for concurrency in levels:
+                result = await getattr(bench, scenario)(concurrency, max(args.messages, concurrency))
+                results.append(result)
+                print(f"  {scenario} x{concurrency}: {result['rate']:.1f} msg/s", file=sys.stderr)
+        if 'broadcast' in scenarios:
+            results.append(await bench.broadcast())
+    finally:
+        await bench.stop()
+
+    print(f"\nStub site: {dict(bench.site.requests)}")
+    print(f"Bot API calls: {dict(bench.api.calls)} ({bench.api.bytes_in / 1024 / 1024:.1f} MB upload)\n")
+    return results
+
+def main():
+    args = parse_args()
+    data_dir = tempfile.mkdtemp(prefix='rei-bench-')
+    levels = configure_env(args, data_dir)
+
+    import bot as botmod
+    from metrics import percentile
+    logging.getLogger().setLevel(args.log_level.upper())
+
+    try:
+        results = asyncio.run(run(args, levels, botmod, percentile))
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    print_results(results, baseline)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+        print(f"\nSaved to {args.save}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Layanan tiruan untuk benchmark offline: situs video stub dan Bot API Telegram.
+
+Keduanya HTTP server lokal (thread terpisah dari event loop bot), sehingga
+bot berjalan lewat jalur aslinya: yt-dlp (generic extractor) untuk info dan
+download, httpx PTB untuk semua request Bot API.
+"""
+import json
+import time
+import threading
+import itertools
+from collections import Counter
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qsl
+
+class _Server:
+    """ThreadingHTTPServer di 127.0.0.1 dengan port acak"""
+
+    def __init__(self, handler):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive agar pool koneksi client dipakai seperti ke server asli
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class StubSite(_Server):
+    """Situs video stub untuk generic extractor yt-dlp.
+
+    /watch/<id> berisi tag <video> (diproses sebagai extraction, dengan
+    extract_latency), /media/<id>.mp4 berisi file sintetis berukuran media_size
+    (dengan download_latency sebelum byte pertama).
+    """
+
+    def __init__(self, media_size=256 * 1024, extract_latency=0.05, download_latency=0.0):
+        self.media = (bytes(range(256)) * (media_size // 256 + 1))[:media_size]
+        self.extract_latency = extract_latency
+        self.download_latency = download_latency
+        self.requests = Counter()
+        site = self
+
+        class Handler(_Handler):
+            def do_GET(self):
+                if self.path.startswith('/watch/'):
+                    site.requests['watch'] += 1
+                    time.sleep(site.extract_latency)
+                    video_id = self.path.rsplit('/', 1)[1]
+                    page = (
+                        f"<html><head><title>Bench {video_id}</title></head><body>"
+                        f"<video controls><source src=\"/media/{video_id}.mp4\" type=\"video/mp4\"></video>"
+                        f"</body></html>"
+                    )
+                    self.reply(200, page.encode(), 'text/html; charset=utf-8')
+                elif self.path.startswith('/media/'):
+                    site.requests['media'] += 1
+                    time.sleep(site.download_latency)
+                    self.reply(200, site.media, 'video/mp4')
+                else:
+                    self.reply(404, b'Not Found', 'text/plain')
+
+        super().__init__(Handler)
+
+    def watch_url(self, video_id):
+        return f"{self.url}/watch/{video_id}"
+
+def _parse_body(content_type, body):
+    """Parameter request PTB: form urlencoded atau multipart (file dilewati)"""
+    if content_type.startswith('multipart/form-data'):
+        message = BytesParser(policy=default_policy).parsebytes(
+            b'Content-Type: ' + content_type.encode() + b'\r\n\r\n' + body
+        )
+        params = {}
+        for part in message.iter_parts():
+            name = part.get_param('name', header='content-disposition')
+            if name and part.get_filename() is None:
+                params[name] = part.get_content()
+        return params
+    if content_type.startswith('application/json'):
+        return json.loads(body or b'{}')
+    return dict(parse_qsl(body.decode()))
+
+class FakeBotAPI(_Server):
+    """Bot API Telegram tiruan: jawab method yang dipakai bot dengan objek minimal yang valid.
+
+    Chat id di `blocked` mendapat 403 untuk sendMessage (user yang memblokir bot).
+    """
+
+    def __init__(self, latency=0.01, blocked=()):
+        self.latency = latency
+        self.blocked = set(blocked)
+        self.calls = Counter()
+        self.bytes_in = 0
+        # Parameter request terakhir per method, untuk diperiksa test
+        self.last_params = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        api = self
+
+        class Handler(_Handler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                method = self.path.rsplit('/', 1)[1]
+                params = _parse_body(self.headers.get('Content-Type', ''), body)
+                with api._lock:
+                    api.calls[method] += 1
+                    api.bytes_in += len(body)
+                    api.last_params[method] = params
+                time.sleep(api.latency)
+                status, payload = api.handle(method, params)
+                self.reply(status, json.dumps(payload).encode(), 'application/json')
+
+            do_GET = do_POST
+
+        super().__init__(Handler)
+
+    def _message(self, chat_id, message_id=None, **extra):
+        return {
+            'message_id': message_id or next(self._ids),
+            'date': int(time.time()),
+            'chat': {'id': int(chat_id), 'type': 'private'},
+            **extra
+        }
+
+    def handle(self, method, params):
+        """Return (status HTTP, payload JSON) untuk satu method Bot API"""
+        chat_id = params.get('chat_id', 0)
+        if method == 'getMe':
+            result = {'id': 1, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'}
+        elif method == 'sendMessage':
+            if int(chat_id) in self.blocked:
+                return 403, {'ok': False, 'error_code': 403, 'description': 'Forbidden: bot was blocked by the user'}
+            result = self._message(chat_id, text=params.get('text', ''))
+        elif method == 'editMessageText':
+            result = self._message(chat_id, int(params.get('message_id', 0)) or None, text=params.get('text', ''))
+        elif method == 'sendVideo':
+            file_number = next(self._ids)
+            result = self._message(chat_id, video={
+                'file_id': f'bench-video-{file_number}',
+                'file_unique_id': f'bench-{file_number}',
+                'width': 640, 'height': 360, 'duration': 1
+            })
+        else:
+            # deleteMessage, answerCallbackQuery, dll.
+            result = True
+        return 200, {'ok': True, 'result': result}
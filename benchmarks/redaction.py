@@ -0,0 +1,75 @@
+"""Micro-benchmark biaya redaksi CustomFormatter per log record.
+
+Jalankan dari root repo:
+    python benchmarks/redaction.py [jumlah_record]
+"""
+import os
+import sys
+import time
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import CustomFormatter
+
+# Nilai sintetis berbentuk token bot (bukan token asli)
+TOKEN = "123456789:" + "A" * 35
+
+# Campuran pesan seperti di log produksi
+SAMPLE_MESSAGES = [
+    "Notification sent to admin: 📥 *DOWNLOAD ATTEMPT DETECTED*...",
+    "[REI_ASSISTANT] [2024-01-01 10:00:00] USER:123 (@user) | ACTION:SEND_LINK | PLATFORM:Telegram | DETAILS:Link: https://youtu.be/abc...",
+    f'HTTP Request: POST https://api.telegram.org/bot{TOKEN}/sendMessage "HTTP/1.1 200 OK"',
+    "Downloading from tiktok: https://www.tiktok.com/@user/video/123",
+    "Shutting down download executor (thread)",
+]
+
+class LegacyFormatter(logging.Formatter):
+    """Implementasi lama (7x lower() + replace) sebagai pembanding"""
+
+    def format(self, record):
+        msg = super().format(record)
+        for keyword in ['bot_token', 'api_key', 'token', 'secret', 'password', 'BOT_TOKEN', 'API_KEY']:
+            if keyword in msg.lower():
+                msg = msg.replace(keyword, '[REDACTED]')
+        return msg
+
+def make_records(count, messages):
+    return [
+        logging.LogRecord('bench', logging.INFO, __file__, 0, messages[i % len(messages)], None, None)
+        for i in range(count)
+    ]
+
+def measure(formatter, records, repeat=5):
+    """Biaya per record dalam mikrodetik (minimum dari beberapa run)"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for record in records:
+            formatter.format(record)
+        best = min(best, time.perf_counter() - start)
+    return best / len(records) * 1e6
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    fmt = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+    plain = logging.Formatter(fmt)
+    legacy = LegacyFormatter(fmt)
+    current = CustomFormatter(fmt, secrets=(TOKEN,))
+
+    # Record tanpa secret (mayoritas) dan record yang memang berisi token
+    clean = [m for m in SAMPLE_MESSAGES if TOKEN not in m]
+    secret = [m for m in SAMPLE_MESSAGES if TOKEN in m]
+
+    print(f"Records: {count} per run")
+    print(f"{'formatter':<20} {'mixed':>10} {'clean':>10} {'secret':>10}  (us/record)")
+    for name, formatter in [('logging.Formatter', plain), ('legacy', legacy), ('CustomFormatter', current)]:
+        costs = [
+            measure(formatter, make_records(count, messages))
+            for messages in (SAMPLE_MESSAGES, clean, secret)
+        ]
+        print(f"{name:<20} {costs[0]:>10.2f} {costs[1]:>10.2f} {costs[2]:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,11 @@
 import os
-import re
+import json
 import logging
 import asyncio
+import secrets
+import contextlib
+import urllib.request
+from pathlib import Path
 from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
@@ -9,17 +13,103 @@ from telegram.ext import (
     filters, ContextTypes, CallbackQueryHandler
 )
 from config import Config
-from downloader import VideoDownloader
+from downloader import VideoDownloader, BufferedVideo
+from executor import DownloadExecutor, ExecutorBusy, JobCoalescer
+from cache import FileIdCache, MetadataCache
+from urls import parse_links, is_collection, make_link
+from scratch import ScratchSpace
+from storage import UserStore
+from notifier import AdminNotifier
+from broadcast import BroadcastManager
+from progress import ProgressReporter, UploadMeter
+from ratelimit import RateLimiter, parse_limits
+from metrics import Metrics
+import transcode
+from transcode import TranscodeError
 from utils import setup_logger, format_file_size, log_rei_activity
 
 # Setup logger
-logger = setup_logger()
+logger = setup_logger(
+    json_activity=Config.ACTIVITY_LOG_JSON,
+    secrets=(Config.BOT_TOKEN, Config.WEBHOOK_SECRET)
+)
 
 class ReiAssistantBot:
     def __init__(self):
         self.config = Config()
-        self.downloader = VideoDownloader(max_size=Config.MAX_FILE_SIZE)
-        self.user_stats = {}
+        
+        # Bot API lokal (telegram-bot-api): batas upload lebih besar, upload lewat path file
+        self.local_api = bool(Config.LOCAL_BOT_API_URL) and self._local_api_available()
+        
+        # Process pool terpisah untuk kompres / potong video besar agar tidak menghambat download
+        self.transcoder = None
+        if Config.OVERSIZE_MODE in ("reencode", "split"):
+            if transcode.available():
+                self.transcoder = DownloadExecutor(
+                    max_workers=Config.TRANSCODE_WORKERS,
+                    max_queue=Config.TRANSCODE_QUEUE_SIZE,
+                    mode="process"
+                )
+            else:
+                logger.warning("OVERSIZE_MODE is set but ffmpeg/ffprobe not found, oversized videos will be rejected")
+        
+        self.meta_cache = MetadataCache(
+            max_entries=Config.META_CACHE_MAX_ENTRIES,
+            ttl=Config.META_CACHE_TTL,
+            error_ttl=Config.META_CACHE_ERROR_TTL,
+            path=Config.META_CACHE_PATH or None
+        )
+        self.downloader = VideoDownloader(
+            max_size=Config.LOCAL_MAX_FILE_SIZE if self.local_api else Config.MAX_FILE_SIZE,
+            meta_cache=self.meta_cache,
+            # Buffer memori tidak bisa dikirim balik dari process pool
+            memory_threshold=Config.MEMORY_DOWNLOAD_MAX_BYTES if Config.DOWNLOAD_POOL == "thread" else 0,
+            download_limit=Config.OVERSIZE_MAX_DOWNLOAD if self.transcoder else None
+        )
+        self.executor = DownloadExecutor(
+            max_workers=Config.DOWNLOAD_WORKERS,
+            max_per_user=Config.MAX_DOWNLOADS_PER_USER,
+            max_queue=Config.DOWNLOAD_QUEUE_SIZE,
+            mode=Config.DOWNLOAD_POOL,
+            priority_users={int(Config.ADMIN_ID), *Config.PREMIUM_USERS}
+        )
+        self.inflight = JobCoalescer()
+        # Kecepatan upload ke Telegram, untuk estimasi progress upload
+        self.upload_meter = UploadMeter()
+        self.scratch = ScratchSpace(
+            Config.SCRATCH_DIR,
+            max_bytes=Config.SCRATCH_MAX_BYTES,
+            min_free_bytes=Config.SCRATCH_MIN_FREE_BYTES
+        )
+        self.file_cache = FileIdCache(
+            Config.FILE_CACHE_PATH,
+            max_entries=Config.FILE_CACHE_MAX_ENTRIES,
+            ttl=Config.FILE_CACHE_TTL
+        )
+        self.users = UserStore(Config.USER_DB_PATH, flush_interval=Config.USER_FLUSH_INTERVAL)
+        
+        # Latency per tahap, hasil per kelas error dan gauge antrian / disk (GET /metrics dan /perf)
+        self.metrics = Metrics()
+        self.metrics_server = None
+        self.metrics.gauge('rei_inflight_jobs', 'Job download berjalan + mengantri', lambda: self.executor.pending)
+        self.metrics.gauge('rei_queue_waiting', 'Job download yang menunggu slot', lambda: self.executor.scheduler.waiting)
+        self.metrics.gauge('rei_transcode_jobs', 'Job konversi berjalan + mengantri',
+                           lambda: self.transcoder.pending if self.transcoder else 0)
+        self.metrics.gauge('rei_scratch_bytes', 'Ukuran file di folder kerja download', lambda: self.scratch.usage_bytes())
+        
+        self.notifier = AdminNotifier(
+            self.config.ADMIN_ID,
+            digest_interval=Config.ADMIN_DIGEST_INTERVAL,
+            dedup_window=Config.ADMIN_ERROR_DEDUP_WINDOW,
+            metrics=self.metrics
+        )
+        self.broadcasts = BroadcastManager(Config.BROADCAST_DB_PATH, rate=Config.BROADCAST_RATE)
+        
+        # Rate limit per user (pesan) dan per platform (extraction keluar), dicek sebelum kerja jaringan
+        self.limiter = RateLimiter(Config.RATE_LIMIT_DB_PATH or None)
+        self.limiter.configure('user', Config.RATE_LIMIT_USER_PER_MINUTE, burst=Config.RATE_LIMIT_USER_BURST)
+        for platform, per_minute in parse_limits(Config.RATE_LIMIT_PLATFORMS).items():
+            self.limiter.configure('platform', per_minute, key=platform)
         self.active_downloads = {}
         
         # Log startup
@@ -27,29 +117,34 @@ class ReiAssistantBot:
         logger.info("REI ASSISTANT VIDEO DOWNLOADER BOT STARTING...")
         logger.info(f"Bot Token: [REDACTED]")
         logger.info(f"Admin ID: {self.config.ADMIN_ID}")
+        logger.info(f"Bot API: {'local ' + Config.LOCAL_BOT_API_URL if self.local_api else 'public'}")
         logger.info("=" * 50)
     
-    async def notify_admin(self, context: ContextTypes.DEFAULT_TYPE, message: str, user_info: dict = None):
-        """Kirim notifikasi real-time ke admin"""
+    def _local_api_available(self):
+        """Cek server Bot API lokal bisa dipakai, jika tidak kembali ke API publik"""
+        url = f"{Config.LOCAL_BOT_API_URL.rstrip('/')}/bot{self.config.BOT_TOKEN}/getMe"
         try:
-            if user_info:
-                user_details = (
-                    f"👤 *User Details:*\n"
-                    f"• ID: `{user_info.get('id', 'N/A')}`\n"
-                    f"• Username: @{user_info.get('username', 'N/A')}\n"
-                    f"• Name: {user_info.get('full_name', 'N/A')}\n"
-                    f"• Language: {user_info.get('language_code', 'N/A')}\n"
-                )
-                message = f"{message}\n\n{user_details}"
-            
-            await context.bot.send_message(
-                chat_id=self.config.ADMIN_ID,
-                text=message,
-                parse_mode='Markdown'
-            )
-            logger.info(f"Notification sent to admin: {message[:50]}...")
+            with urllib.request.urlopen(url, timeout=5) as response:
+                return bool(json.load(response).get('ok'))
         except Exception as e:
-            logger.error(f"Failed to notify admin: {e}")
+            logger.warning(f"Local Bot API server unavailable, falling back to public API: {e}")
+            return False
+    
+    async def notify_admin(self, context: ContextTypes.DEFAULT_TYPE, message: str, user_info: dict = None,
+                           dedup_key: str = None):
+        """Kirim notifikasi kritis ke admin lewat antrian (tidak menunggu pengiriman)"""
+        if user_info:
+            user_details = (
+                f"👤 *User Details:*\n"
+                f"• ID: `{user_info.get('id', 'N/A')}`\n"
+                f"• Username: @{user_info.get('username', 'N/A')}\n"
+                f"• Name: {user_info.get('full_name', 'N/A')}\n"
+                f"• Language: {user_info.get('language_code', 'N/A')}\n"
+            )
+            message = f"{message}\n\n{user_details}"
+        
+        # Error identik dalam satu menit hanya dikirim sekali
+        self.notifier.critical(message, key=dedup_key)
     
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler untuk command /start"""
@@ -63,17 +158,8 @@ class ReiAssistantBot:
             platform="Telegram"
         )
         
-        # Update user stats
-        if user.id not in self.user_stats:
-            self.user_stats[user.id] = {
-                'username': user.username,
-                'full_name': user.full_name,
-                'downloads': 0,
-                'first_seen': datetime.now(),
-                'last_seen': datetime.now()
-            }
-        else:
-            self.user_stats[user.id]['last_seen'] = datetime.now()
+        # Update user stats (di memori, di-flush ke database secara berkala)
+        _, is_new = self.users.touch(user.id, user.username, user.full_name)
         
         # Send welcome message
         welcome_text = Config.WELCOME_MESSAGE
@@ -92,20 +178,9 @@ class ReiAssistantBot:
             reply_markup=reply_markup
         )
         
-        # Kirim notifikasi ke admin
-        user_info = {
-            'id': user.id,
-            'username': user.username,
-            'full_name': user.full_name,
-            'language_code': user.language_code
-        }
-        
-        notification_msg = (
-            "🚀 *NEW USER STARTED BOT*\n"
-            f"*Rei Assistant* mendapatkan pengguna baru!"
-        )
-        
-        await self.notify_admin(context, notification_msg, user_info)
+        # User baru masuk digest admin berikutnya
+        if is_new:
+            self.notifier.record('new_user', username=user.username or user.full_name)
     
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler untuk command /help"""
@@ -152,33 +227,77 @@ class ReiAssistantBot:
         
         if user.id == int(self.config.ADMIN_ID):
             # Admin stats
-            total_users = len(self.user_stats)
-            total_downloads = sum(stats.get('downloads', 0) for stats in self.user_stats.values())
-            active_today = len([u for u in self.user_stats.values() 
-                               if (datetime.now() - u.get('last_seen', datetime.now())).days < 1])
+            # Counter di-update saat event terjadi, tidak perlu scan semua user
+            counters = self.users.counters
+            today = counters.today()
+            week = counters.summary(7)
+            month = counters.summary(30)
+            total_users = counters.total_users
+            total_downloads = counters.total_downloads
             
-            # Top users
-            top_users = sorted(self.user_stats.items(), 
-                              key=lambda x: x[1].get('downloads', 0), 
-                              reverse=True)[:5]
+            platform_text = "\n".join([
+                f"• {name.title()}: {count}"
+                for name, count in sorted(month['platforms'].items(), key=lambda x: x[1], reverse=True)
+            ]) or "• -"
+            
+            history_text = "\n".join([
+                f"{bucket.day[5:]}: {bucket.downloads} dl | {bucket.new} new | "
+                f"{bucket.active} active | {bucket.failures} failed"
+                for bucket in counters.history(7)
+            ])
+            
+            # Top users (dari index leaderboard, tanpa sorting semua user)
+            top_users = self.users.top(5)
             
             top_users_text = "\n".join([
-                f"{i+1}. {data.get('username', 'N/A')}: {data.get('downloads', 0)} downloads"
-                for i, (uid, data) in enumerate(top_users)
+                f"{i+1}. {record.username or 'N/A'}: {record.downloads} downloads"
+                for i, record in enumerate(top_users)
             ])
             
+            cache_stats = self.file_cache.stats()
+            meta_stats = self.meta_cache.stats()
+            durations_text = ", ".join(
+                f"{kind.title()} {seconds:.0f}s"
+                for kind, seconds in sorted(self.executor.durations.snapshot().items())
+            ) or "-"
+            
             stats_text = f"""
             📊 *REI ASSISTANT - Admin Statistics*
             
             👥 *Users:*
             • Total: {total_users}
-            • Active Today: {active_today}
-            • New Today: {len([u for u in self.user_stats.values() 
-                              if (datetime.now() - u.get('first_seen', datetime.now())).days < 1])}
+            • Active Today: {today.active}
+            • New Today: {today.new}
+            • New 7/30 Days: {week['new']} / {month['new']}
             
             📥 *Downloads:*
             • Total: {total_downloads}
             • Avg per User: {total_downloads/max(total_users, 1):.1f}
+            • Today: {today.downloads} | Failed: {today.failures}
+            • 7 Days: {week['downloads']} | Failed: {week['failures']}
+            • 30 Days: {month['downloads']} | Failed: {month['failures']}
+            
+            🌐 *Platforms (30 Days):*
+            {platform_text}
+            
+            📅 *Last 7 Days:*
+            {history_text}
+            
+            💾 *File Cache:*
+            • Hit: {cache_stats['hits']} | Miss: {cache_stats['misses']}
+            • Hit Rate: {cache_stats['hit_rate']:.1f}%
+            • Entries: {cache_stats['entries']}
+            • Coalesced: {self.inflight.coalesced}
+            
+            🧠 *Metadata Cache:*
+            • Hit: {meta_stats['hits']} | Miss: {meta_stats['misses']}
+            • Hit Rate: {meta_stats['hit_rate']:.1f}%
+            
+            ⚙️ *Queues:*
+            • Download: {self.executor.pending} (jalan {self.executor.scheduler.running}, antri {self.executor.scheduler.waiting})
+            • Durasi Rata-rata: {durations_text}
+            • Rate Limited: user {self.limiter.rejected.get('user', 0)} | platform {self.limiter.rejected.get('platform', 0)}
+            • Konversi: {self.transcoder.pending if self.transcoder else 'off'}
             
             🏆 *Top 5 Users:*
             {top_users_text}
@@ -189,9 +308,9 @@ class ReiAssistantBot:
             await update.message.reply_text(stats_text, parse_mode='Markdown')
         else:
             # User stats personal
-            user_data = self.user_stats.get(user.id, {})
-            downloads = user_data.get('downloads', 0)
-            first_seen = user_data.get('first_seen', datetime.now())
+            record = self.users.get(user.id)
+            downloads = record.downloads if record else 0
+            first_seen = datetime.fromtimestamp(record.first_seen) if record else datetime.now()
             days_used = (datetime.now() - first_seen).days
             
             user_stats_text = f"""
@@ -215,30 +334,390 @@ class ReiAssistantBot:
     
     def get_user_rank(self, user_id):
         """Get user ranking based on downloads"""
-        if user_id not in self.user_stats:
+        ranking = self.users.rank(user_id)
+        if ranking is None:
             return "Belum ada aktivitas"
         
-        user_downloads = self.user_stats[user_id].get('downloads', 0)
-        all_users = [(uid, data.get('downloads', 0)) 
-                     for uid, data in self.user_stats.items()]
+        rank, total_users, percentile = ranking
         
-        sorted_users = sorted(all_users, key=lambda x: x[1], reverse=True)
+        if percentile <= 10:
+            return f"🏅 Top {rank}/{total_users} (Elite User)"
+        elif percentile <= 30:
+            return f"🥈 Top {rank}/{total_users} (Power User)"
+        elif percentile <= 60:
+            return f"🥉 Top {rank}/{total_users} (Active User)"
+        else:
+            return f"📊 #{rank}/{total_users} (Regular User)"
+    
+    def _video_caption(self, title, platform, file_size, part=None):
+        """Caption video yang dikirim ke user, part = (nomor, total) untuk video yang dipotong"""
+        part_line = f"🧩 *Part:* {part[0]}/{part[1]}\n" if part else ""
+        return (
+            f"✅ *REI ASSISTANT - DOWNLOAD SELESAI*\n\n"
+            f"📹 *{title}*\n"
+            f"🌐 *Platform:* {platform}\n"
+            f"💾 *Size:* {format_file_size(file_size or 0)}\n"
+            f"{part_line}\n"
+            f"{Config.ADS_MESSAGE}"
+        )
+    
+    def _open_media(self, media):
+        """Return (file untuk reply_video, nama file, ukuran) dari path atau BufferedVideo"""
+        if isinstance(media, BufferedVideo):
+            # Klip kecil sudah ada di memori
+            return media.buffer, media.filename, media.size
+        if self.local_api:
+            # Server lokal membaca file langsung dari disk (file://), tanpa upload multipart
+            return contextlib.nullcontext(Path(media).absolute()), None, os.path.getsize(media)
+        return open(media, 'rb'), os.path.basename(media), os.path.getsize(media)
+    
+    async def _send_followup(self, update: Update):
+        """Kirim follow-up message dengan tombol setelah download berhasil"""
+        keyboard = [
+            [
+                InlineKeyboardButton("📥 Download Lain", callback_data="download_another"),
+                InlineKeyboardButton("⭐ Rate Bot", url="https://t.me/bots")
+            ],
+            [
+                InlineKeyboardButton("👥 Join Channel", url="https://t.me/your_channel"),
+                InlineKeyboardButton("💬 Support", url="https://t.me/your_support")
+            ]
+        ]
+        reply_markup = InlineKeyboardMarkup(keyboard)
         
-        for rank, (uid, downloads) in enumerate(sorted_users, 1):
-            if uid == user_id:
-                total_users = len(sorted_users)
-                percentile = (rank / total_users) * 100 if total_users > 0 else 0
+        await update.message.reply_text(
+            "🎉 *Download Berhasil!*\n\n"
+            "Ingin download video lain?\n"
+            "Cukup kirim link baru!",
+            parse_mode='Markdown',
+            reply_markup=reply_markup
+        )
+    
+    async def _edit_status(self, processing_msg, text: str, **kwargs):
+        """Edit pesan status, dilewati untuk item batch (status batch di-update terpisah)"""
+        if processing_msg is not None:
+            await processing_msg.edit_text(text, **kwargs)
+    
+    async def send_cached_video(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
+                                processing_msg, cached: dict, user_info: dict):
+        """Kirim ulang video lewat file_id Telegram tanpa download"""
+        user = update.effective_user
+        
+        # Video yang dipotong dikirim ulang per part
+        file_ids = cached.get('part_ids') or [cached['file_id']]
+        try:
+            for index, file_id in enumerate(file_ids, 1):
+                await update.message.reply_video(
+                    video=file_id,
+                    caption=self._video_caption(
+                        cached['title'], cached['platform'], cached['file_size'],
+                        part=(index, len(file_ids)) if len(file_ids) > 1 else None
+                    ),
+                    parse_mode='Markdown',
+                    supports_streaming=True
+                )
+        except Exception as e:
+            # file_id sudah tidak valid, lanjut download normal
+            logger.warning(f"Cached file_id for {cached['key']} rejected: {e}")
+            self.file_cache.invalidate(*cached['key'])
+            return False
+        
+        self.users.add_download(user.id, (cached['platform'] or 'unknown').lower())
+        if processing_msg is not None:
+            await processing_msg.delete()
+        
+        self.notifier.record('cache_hit', cached['platform'] or 'unknown')
+        return True
+    
+    async def download_and_send(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
+                                processing_msg, video_info: dict, cache_key: tuple, url_key: str,
+                                user_info: dict):
+        """Download video lalu upload ke chat user, hasilnya dipakai juga oleh request lain untuk video yang sama"""
+        user = update.effective_user
+        platform = video_info.get('platform', 'unknown').title()
+        
+        # Progress hanya untuk status per link (bukan item batch)
+        progress = None
+        download_kwargs = {}
+        if processing_msg is not None:
+            progress = ProgressReporter(processing_msg, interval=Config.PROGRESS_INTERVAL)
+            # Hook tidak bisa dikirim ke process pool
+            if self.executor.mode == 'thread':
+                download_kwargs['progress_hook'] = progress.hook
+        
+        # Folder kerja per job, selalu dihapus (sukses, error maupun cancel)
+        async with self.scratch.job() as job_dir:
+            # Download dari info yang sudah di-resolve (tanpa extract ulang)
+            with self.metrics.timer('download', video_info['platform']):
+                media, status = await self.executor.submit(
+                    user.id, video_info['platform'], self.downloader.download_info,
+                    video_info['info'], video_info['platform'], job_dir,
+                    on_queued=self._queue_notice(processing_msg),
+                    **download_kwargs
+                )
+            if progress:
+                await progress.settle()
+            
+            # File melebihi batas Telegram: kompres / potong di process pool terpisah
+            parts = [media] if media else []
+            if (media and self.transcoder and not isinstance(media, BufferedVideo)
+                    and os.path.getsize(media) > self.downloader.max_size):
+                await self._edit_status(
+                    processing_msg,
+                    f"🎞️ *Video melebihi {format_file_size(self.downloader.max_size)}, sedang dikonversi...*\n"
+                    f"⏳ *Antrian konversi:* {self.transcoder.pending}",
+                    parse_mode='Markdown'
+                )
+                try:
+                    with self.metrics.timer('transcode', video_info['platform']):
+                        parts = await self.transcoder.run(
+                            None, transcode.fit_video,
+                            media, video_info.get('duration'), self.downloader.max_size, job_dir,
+                            Config.OVERSIZE_MODE, Config.TRANSCODE_CPU_LIMIT
+                        )
+                except TranscodeError as e:
+                    media, status, parts = None, str(e), []
+            
+            if not media:
+                error_msg = f"❌ *Download Gagal!*\n\nError: {status}"
+                await self._edit_status(processing_msg, error_msg)
                 
-                if percentile <= 10:
-                    return f"🏅 Top {rank}/{total_users} (Elite User)"
-                elif percentile <= 30:
-                    return f"🥈 Top {rank}/{total_users} (Power User)"
-                elif percentile <= 60:
-                    return f"🥉 Top {rank}/{total_users} (Active User)"
-                else:
-                    return f"📊 #{rank}/{total_users} (Regular User)"
-        
-        return "Unranked"
+                # Error masuk digest admin
+                self.notifier.record_error(video_info['platform'], status, user.username)
+                self.users.record_failure(video_info['platform'])
+                return {'error': status}
+            
+            # Update processing message
+            with self.metrics.timer('stat', video_info['platform']):
+                total_size = sum(part.size if isinstance(part, BufferedVideo) else os.path.getsize(part) for part in parts)
+            await self._edit_status(
+                processing_msg,
+                f"✅ *Download Selesai!*\n"
+                f"📁 *File Size:* {format_file_size(total_size)}\n"
+                f"📤 *Mengupload ke Telegram...*"
+            )
+            
+            # Kirim video (satu file, atau per part jika dipotong)
+            file_ids = []
+            for index, part in enumerate(parts, 1):
+                video_file, upload_name, file_size = self._open_media(part)
+                uploading = progress.uploading(file_size, self.upload_meter) if progress else contextlib.nullcontext()
+                with self.metrics.timer('upload', video_info['platform']):
+                    async with uploading:
+                        with video_file as video:
+                            sent_message = await update.message.reply_video(
+                                video=video,
+                                filename=upload_name,
+                                caption=self._video_caption(
+                                    video_info['title'], platform, file_size,
+                                    part=(index, len(parts)) if len(parts) > 1 else None
+                                ),
+                                parse_mode='Markdown',
+                                supports_streaming=True,
+                                thumbnail=open('thumbnail.jpg', 'rb') if os.path.exists('thumbnail.jpg') else None
+                            )
+                uploaded = sent_message.video or sent_message.document
+                file_ids.append(uploaded.file_id if uploaded else None)
+            
+            # Simpan file_id agar video yang sama bisa dikirim ulang tanpa download (hanya video utuh)
+            if len(parts) == 1 and uploaded:
+                self.file_cache.put(
+                    *cache_key, uploaded.file_id,
+                    title=video_info['title'],
+                    platform=platform,
+                    file_size=file_size
+                )
+                self.file_cache.remember_url(url_key, *cache_key)
+        
+        return {
+            'file_id': file_ids[0] if len(file_ids) == 1 else None,
+            'part_ids': file_ids if len(file_ids) > 1 and all(file_ids) else None,
+            'title': video_info['title'],
+            'platform': platform,
+            'file_size': total_size,
+            'key': cache_key
+        }
+    
+    async def fetch_video_info(self, user_id, url, processing_msg=None):
+        """Extract info lewat executor lalu simpan ke cache metadata, return video_info atau None"""
+        video_info, error = await self.executor.submit(
+            user_id, 'info', self.downloader.fetch_info, url,
+            on_queued=self._queue_notice(processing_msg)
+        )
+        # Cache diisi di event loop, worker process pool tidak memegang cache
+        if video_info:
+            self.meta_cache.put(url, video_info)
+        else:
+            self.meta_cache.put_error(url, error)
+        return video_info
+    
+    async def process_link(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
+                           link, user_info: dict, processing_msg=None):
+        """Proses satu link sampai video terkirim, return None jika sukses atau pesan error.
+        
+        processing_msg dipakai untuk status per link; None untuk item batch.
+        """
+        user = update.effective_user
+        url_key = link.key
+        
+        # Link yang sama pernah dikirim: langsung kirim via file_id
+        cached = self.file_cache.get_by_url(url_key)
+        if cached and await self.send_cached_video(update, context, processing_msg, cached, user_info):
+            return None
+        
+        # Get video info (dari cache metadata jika ada, termasuk link yang diketahui gagal)
+        found, video_info = self.downloader.lookup_info(link.url)
+        if not found:
+            # Link yang sama sedang di-resolve: ikut menunggu hasilnya tanpa request baru
+            info_key = ('info', url_key)
+            retry_after = 0 if self.inflight.is_running(info_key) else self.limiter.check('platform', link.platform)
+            if retry_after:
+                await self._edit_status(processing_msg, self._rate_limit_text(retry_after, link.platform), parse_mode='Markdown')
+                return f"Terlalu banyak permintaan ke {link.platform.title()}, coba lagi dalam {int(retry_after) + 1} detik"
+            with self.metrics.timer('info', link.platform):
+                video_info, _ = await self.inflight.run(
+                    info_key, lambda: self.fetch_video_info(user.id, link.url, processing_msg)
+                )
+        
+        if not video_info:
+            self.users.record_failure(link.platform)
+            await self._edit_status(
+                processing_msg,
+                "❌ *Tidak bisa mendapatkan info video!*\n"
+                "Pastikan link valid dan video tersedia."
+            )
+            return "Tidak bisa mendapatkan info video"
+        
+        platform = video_info.get('platform', 'unknown').title()
+        
+        # Video yang sama (beda link) sudah pernah diupload
+        cache_key = FileIdCache.make_key(video_info['info'])
+        cached = self.file_cache.get(*cache_key)
+        if cached and await self.send_cached_video(update, context, processing_msg, cached, user_info):
+            self.file_cache.remember_url(url_key, *cache_key)
+            return None
+        
+        # Cek format yang muat di batas Telegram sebelum memakai bandwidth
+        plan, plan_error = self.downloader.plan_format(video_info['info'])
+        if not plan:
+            self.users.record_failure(video_info['platform'])
+            self.notifier.record_error(video_info['platform'], plan_error, user.username)
+            await self._edit_status(
+                processing_msg,
+                f"❌ *Video Tidak Bisa Dikirim!*\n\n"
+                f"{plan_error}\n"
+                f"Coba video yang lebih pendek.",
+                parse_mode='Markdown'
+            )
+            return plan_error
+        
+        # Update processing message
+        await self._edit_status(
+            processing_msg,
+            f"✅ *Platform Terdeteksi:* {platform}\n"
+            f"📹 *Judul:* {video_info['title'][:60]}...\n"
+            f"⏱️ *Durasi:* {video_info.get('duration', 0)} detik\n"
+            f"⬇️ *Mendownload video...*"
+        )
+        
+        # Video yang sama sedang didownload user lain: tunggu hasilnya
+        if self.inflight.is_running(cache_key):
+            await self._edit_status(
+                processing_msg,
+                "⏳ *Video yang sama sedang diproses...*\n"
+                "Rei Assistant akan mengirimkannya begitu selesai.",
+                parse_mode='Markdown'
+            )
+        
+        result, shared = await self.inflight.run(
+            cache_key,
+            lambda: self.download_and_send(
+                update, context, processing_msg, video_info, cache_key, url_key, user_info
+            )
+        )
+        
+        if shared:
+            # Kirim file hasil job pertama lewat file_id
+            if (result.get('file_id') or result.get('part_ids')) and await self.send_cached_video(
+                    update, context, processing_msg, result, user_info):
+                if result.get('file_id'):
+                    self.file_cache.remember_url(url_key, *cache_key)
+                return None
+            
+            error = result.get('error', 'Upload gagal')
+            await self._edit_status(processing_msg, f"❌ *Download Gagal!*\n\nError: {error}")
+            return error
+        
+        if result.get('error'):
+            return result['error']
+        
+        # Update stats
+        self.users.add_download(user.id, video_info['platform'])
+        
+        # Update processing message
+        if processing_msg is not None:
+            await processing_msg.delete()
+        
+        # Sukses masuk digest admin
+        self.notifier.record('success', video_info['platform'])
+        return None
+    
+    def _queue_notice(self, processing_msg):
+        """Callback on_queued executor: posisi antrian dan estimasi waktu tunggu"""
+        if processing_msg is None:
+            return None
+        
+        async def notice(position, eta):
+            wait = f"{int(eta)} detik" if eta < 90 else f"{eta / 60:.0f} menit"
+            try:
+                await processing_msg.edit_text(
+                    f"⏳ *Kamu di antrian #{position}*\n"
+                    f"⏱️ *Estimasi mulai:* ~{wait}\n\n"
+                    f"Rei Assistant akan memproses begitu giliranmu tiba.",
+                    parse_mode='Markdown'
+                )
+            except Exception as e:
+                logger.warning(f"Failed to send queue position: {e}")
+        return notice
+    
+    def _rate_limit_text(self, retry_after: float, platform: str = None):
+        """Pesan untuk user yang terkena rate limit"""
+        reason = (
+            f"Terlalu banyak permintaan ke {platform.title()} saat ini." if platform
+            else "Kamu mengirim link terlalu cepat."
+        )
+        return (
+            "🐢 *Pelan-pelan ya!*\n\n"
+            f"{reason}\n"
+            f"Coba lagi dalam {int(retry_after) + 1} detik."
+        )
+    
+    def _busy_text(self, error: ExecutorBusy, user_id: int):
+        """Pesan untuk user saat antrian download penuh"""
+        if error.user_id == user_id:
+            return (
+                "⏳ *Tunggu sebentar!*\n\n"
+                f"Kamu masih punya {Config.MAX_DOWNLOADS_PER_USER} download yang sedang diproses.\n"
+                "Kirim link berikutnya setelah selesai."
+            )
+        return (
+            "🚦 *Rei Assistant sedang sibuk!*\n\n"
+            "Antrian download sedang penuh.\n"
+            "Silakan coba lagi dalam beberapa menit."
+        )
+    
+    async def _report_error(self, context: ContextTypes.DEFAULT_TYPE, error: Exception, link, user_info: dict):
+        """Catat error tak terduga dan kirim notifikasi kritis ke admin"""
+        logger.error(f"Error processing video: {str(error)}", exc_info=True)
+        self.users.record_failure(link.platform)
+        
+        error_notification = (
+            f"🚨 *CRITICAL ERROR*\n"
+            f"*User:* @{user_info.get('username') or 'no_username'}\n"
+            f"*Error:* ```{str(error)[:200]}```\n"
+            f"*Link:* `{link.url[:30]}...`"
+        )
+        await self.notify_admin(context, error_notification, user_info, dedup_key=str(error)[:200])
     
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler untuk pesan berisi link"""
@@ -254,28 +733,14 @@ class ReiAssistantBot:
             details=f"Link: {message_text[:50]}..."
         )
         
-        # Update user stats
-        if user.id not in self.user_stats:
-            self.user_stats[user.id] = {
-                'username': user.username,
-                'full_name': user.full_name,
-                'downloads': 0,
-                'first_seen': datetime.now(),
-                'last_seen': datetime.now()
-            }
-        else:
-            self.user_stats[user.id]['last_seen'] = datetime.now()
-        
-        # Cek apakah pesan berisi URL
-        url_patterns = [
-            r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+',
-            r'www\.[^\s]+',
-            r'[^\s]+\.[a-zA-Z]{2,}[^\s]*'
-        ]
+        # Update user stats (di memori, di-flush ke database secara berkala)
+        self.users.touch(user.id, user.username, user.full_name)
         
-        is_url = any(re.search(pattern, message_text) for pattern in url_patterns)
+        # Ambil link video dari pesan (tanpa yt-dlp), tolak pesan tanpa link yang didukung
+        with self.metrics.timer('parse', 'all'):
+            links = parse_links(message_text, allow_unknown=Config.ALLOW_OTHER_SITES)
         
-        if not is_url:
+        if not links:
             await update.message.reply_text(
                 "❌ *Format tidak valid!*\n\n"
                 "Silakan kirim link video yang valid dari:\n"
@@ -285,22 +750,27 @@ class ReiAssistantBot:
             )
             return
         
-        # Kirim notifikasi ke admin tentang download attempt
+        # Tolak spam sebelum ada pekerjaan jaringan (admin tidak dibatasi)
+        if user.id != int(Config.ADMIN_ID):
+            retry_after = self.limiter.check('user', user.id)
+            if retry_after:
+                await update.message.reply_text(self._rate_limit_text(retry_after), parse_mode='Markdown')
+                return
+        
         user_info = {
             'id': user.id,
             'username': user.username,
             'full_name': user.full_name,
-            'download_count': self.user_stats[user.id].get('downloads', 0)
+            'download_count': self.users.get(user.id).downloads
         }
         
-        download_notification = (
-            "📥 *DOWNLOAD ATTEMPT DETECTED*\n"
-            f"*User:* @{user.username or 'no_username'}\n"
-            f"*Link:* `{message_text[:30]}...`\n"
-            f"*Previous Downloads:* {user_info['download_count']}"
-        )
+        # Beberapa link atau playlist / profil: diproses sebagai batch
+        if len(links) > 1 or is_collection(links[0].url):
+            await self.handle_batch(update, context, links, user_info)
+            return
         
-        await self.notify_admin(context, download_notification, user_info)
+        link = links[0]
+        self.notifier.record('attempt')
         
         # Kirim pesan sedang memproses
         processing_msg = await update.message.reply_text(
@@ -309,139 +779,21 @@ class ReiAssistantBot:
             parse_mode='Markdown'
         )
         
+        error = None
         try:
-            # Get video info
-            video_info = self.downloader.get_video_info(message_text)
-            
-            if not video_info:
-                await processing_msg.edit_text(
-                    "❌ *Tidak bisa mendapatkan info video!*\n"
-                    "Pastikan link valid dan video tersedia."
-                )
-                return
-            
-            platform = video_info.get('platform', 'unknown').title()
+            with self.metrics.timer('total', link.platform):
+                error = await self.process_link(update, context, link, user_info, processing_msg)
+            if error is None:
+                # Kirim follow-up message dengan tombol
+                await self._send_followup(update)
             
-            # Update processing message
-            await processing_msg.edit_text(
-                f"✅ *Platform Terdeteksi:* {platform}\n"
-                f"📹 *Judul:* {video_info['title'][:60]}...\n"
-                f"⏱️ *Durasi:* {video_info.get('duration', 0)} detik\n"
-                f"⬇️ *Mendownload video...*"
-            )
-            
-            # Kirim notifikasi platform detection ke admin
-            platform_notification = (
-                f"🌐 *PLATFORM DETECTED*\n"
-                f"*Platform:* {platform}\n"
-                f"*User:* @{user.username or 'no_username'}\n"
-                f"*Video:* {video_info['title'][:50]}..."
-            )
-            await self.notify_admin(context, platform_notification, user_info)
-            
-            # Download video
-            filename, status = self.downloader.download_video(message_text)
-            
-            if not filename:
-                error_msg = f"❌ *Download Gagal!*\n\nError: {status}"
-                await processing_msg.edit_text(error_msg)
-                
-                # Kirim notifikasi error ke admin
-                error_notification = (
-                    f"❌ *DOWNLOAD FAILED*\n"
-                    f"*User:* @{user.username or 'no_username'}\n"
-                    f"*Platform:* {platform}\n"
-                    f"*Error:* {status}\n"
-                    f"*Link:* `{message_text[:30]}...`"
-                )
-                await self.notify_admin(context, error_notification, user_info)
-                return
-            
-            # Cek jika file ada
-            if not os.path.exists(filename):
-                # Cari file dengan ekstensi video
-                video_files = [f for f in os.listdir('.') 
-                             if f.endswith(('.mp4', '.mkv', '.webm', '.mov', '.avi'))]
-                if video_files:
-                    filename = video_files[0]
-                else:
-                    await processing_msg.edit_text("❌ File video tidak ditemukan setelah download!")
-                    return
-            
-            # Get file size
-            file_size = os.path.getsize(filename)
-            
-            # Update processing message
-            await processing_msg.edit_text(
-                f"✅ *Download Selesai!*\n"
-                f"📁 *File Size:* {format_file_size(file_size)}\n"
-                f"📤 *Mengupload ke Telegram...*"
-            )
-            
-            # Kirim video
-            with open(filename, 'rb') as video_file:
-                sent_message = await update.message.reply_video(
-                    video=video_file,
-                    caption=(
-                        f"✅ *REI ASSISTANT - DOWNLOAD SELESAI*\n\n"
-                        f"📹 *{video_info['title']}*\n"
-                        f"🌐 *Platform:* {platform}\n"
-                        f"💾 *Size:* {format_file_size(file_size)}\n\n"
-                        f"{Config.ADS_MESSAGE}"
-                    ),
-                    parse_mode='Markdown',
-                    supports_streaming=True,
-                    thumbnail=open('thumbnail.jpg', 'rb') if os.path.exists('thumbnail.jpg') else None
-                )
-            
-            # Update stats
-            self.user_stats[user.id]['downloads'] = self.user_stats[user.id].get('downloads', 0) + 1
-            
-            # Update processing message
-            await processing_msg.delete()
-            
-            # Kirim notifikasi sukses ke admin dengan detail lengkap
-            success_notification = (
-                f"✅ *DOWNLOAD SUCCESS*\n"
-                f"*User:* @{user.username or 'no_username'}\n"
-                f"*Platform:* {platform}\n"
-                f"*Video:* {video_info['title'][:50]}...\n"
-                f"*Size:* {format_file_size(file_size)}\n"
-                f"*Total User Downloads:* {self.user_stats[user.id]['downloads']}\n"
-                f"*Link:* `{message_text[:30]}...`"
-            )
-            await self.notify_admin(context, success_notification, user_info)
-            
-            # Kirim follow-up message dengan tombol
-            keyboard = [
-                [
-                    InlineKeyboardButton("📥 Download Lain", callback_data="download_another"),
-                    InlineKeyboardButton("⭐ Rate Bot", url="https://t.me/bots")
-                ],
-                [
-                    InlineKeyboardButton("👥 Join Channel", url="https://t.me/your_channel"),
-                    InlineKeyboardButton("💬 Support", url="https://t.me/your_support")
-                ]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await update.message.reply_text(
-                "🎉 *Download Berhasil!*\n\n"
-                "Ingin download video lain?\n"
-                "Cukup kirim link baru!",
-                parse_mode='Markdown',
-                reply_markup=reply_markup
-            )
-            
-            # Cleanup file
-            try:
-                os.remove(filename)
-            except Exception as e:
-                logger.error(f"Failed to cleanup file: {e}")
+        except ExecutorBusy as e:
+            error = e
+            logger.warning(f"Download rejected for {user.id}: {e}")
+            await processing_msg.edit_text(self._busy_text(e, user.id), parse_mode='Markdown')
             
         except Exception as e:
-            logger.error(f"Error processing video: {str(e)}", exc_info=True)
-            
+            error = e
             # Kirim error message
             error_text = (
                 "❌ *Terjadi Error!*\n\n"
@@ -449,20 +801,149 @@ class ReiAssistantBot:
                 "Silakan coba lagi nanti atau gunakan link yang berbeda.\n\n"
                 f"Error: `{str(e)[:100]}...`"
             )
+            await processing_msg.edit_text(error_text)
             
-            if 'processing_msg' in locals():
-                await processing_msg.edit_text(error_text)
+            # Kirim notifikasi error ke admin
+            await self._report_error(context, e, link, user_info)
+        
+        self.metrics.count(link.platform, error)
+    
+    def _batch_text(self, progress: dict, done: bool = False):
+        """Teks status batch"""
+        finished = progress['sent'] + progress['failed']
+        total = max(progress['total'], 1)
+        bar = '▓' * (finished * 10 // total) + '░' * (10 - finished * 10 // total)
+        title = "✅ *Batch Selesai!*" if done else "📦 *Batch Download*"
+        text = (
+            f"{title}\n\n"
+            f"{bar} {finished}/{progress['total']}\n"
+            f"✅ Terkirim: {progress['sent']}\n"
+            f"❌ Gagal: {progress['failed']}"
+        )
+        if not done:
+            text += f"\n⏳ Diproses: {progress['running']}"
+        return text
+    
+    async def handle_batch(self, update: Update, context: ContextTypes.DEFAULT_TYPE, links: list, user_info: dict):
+        """Proses banyak link / isi playlist paralel (dibatasi), video dikirim begitu selesai"""
+        user = update.effective_user
+        status_msg = await update.message.reply_text(
+            "📦 *Batch Download*\n\n🔍 Membaca daftar video...",
+            parse_mode='Markdown'
+        )
+        
+        # Playlist / profil dibuka lewat flat extraction (tanpa resolve tiap video)
+        items, seen = [], set()
+        for link in links:
+            if len(items) >= Config.BATCH_MAX_ITEMS:
+                break
+            if is_collection(link.url):
+                retry_after = self.limiter.check('platform', link.platform)
+                if retry_after:
+                    await status_msg.edit_text(self._rate_limit_text(retry_after, link.platform), parse_mode='Markdown')
+                    return
+                try:
+                    entries = await self.executor.run(
+                        user.id, self.downloader.expand_playlist, link.url, Config.BATCH_MAX_ITEMS
+                    )
+                except ExecutorBusy as e:
+                    await status_msg.edit_text(self._busy_text(e, user.id), parse_mode='Markdown')
+                    return
+                entries = [make_link(url) for url in entries]
             else:
-                await update.message.reply_text(error_text, parse_mode='Markdown')
+                entries = [link]
             
-            # Kirim notifikasi error ke admin
-            error_notification = (
-                f"🚨 *CRITICAL ERROR*\n"
-                f"*User:* @{user.username or 'no_username'}\n"
-                f"*Error:* ```{str(e)[:200]}```\n"
-                f"*Link:* `{message_text[:30]}...`"
+            for entry in entries:
+                if entry.key not in seen:
+                    seen.add(entry.key)
+                    items.append(entry)
+        items = items[:Config.BATCH_MAX_ITEMS]
+        
+        if not items:
+            await status_msg.edit_text(
+                "❌ *Tidak ada video yang bisa diproses!*\n"
+                "Playlist kosong atau tidak bisa dibaca.",
+                parse_mode='Markdown'
             )
-            await self.notify_admin(context, error_notification, user_info)
+            return
+        
+        progress = {'total': len(items), 'sent': 0, 'failed': 0, 'running': 0}
+        last_update = {'time': 0.0, 'text': None}
+        
+        async def refresh(done=False):
+            # Edit pesan status maksimal tiap 2 detik (limit edit Telegram)
+            now = asyncio.get_running_loop().time()
+            text = self._batch_text(progress, done)
+            if text == last_update['text'] or (not done and now - last_update['time'] < 2):
+                return
+            last_update['time'], last_update['text'] = now, text
+            try:
+                await status_msg.edit_text(text, parse_mode='Markdown')
+            except Exception as e:
+                logger.warning(f"Failed to update batch status: {e}")
+        
+        # Tidak melebihi kuota download per user agar item tidak ditolak executor
+        slots = asyncio.Semaphore(max(1, min(Config.BATCH_CONCURRENCY, Config.MAX_DOWNLOADS_PER_USER)))
+        
+        async def run_item(link):
+            async with slots:
+                self.notifier.record('attempt')
+                progress['running'] += 1
+                try:
+                    with self.metrics.timer('total', link.platform):
+                        error = await self.process_link(update, context, link, user_info)
+                except ExecutorBusy as e:
+                    logger.warning(f"Batch item rejected for {user.id}: {e}")
+                    error = e
+                except Exception as e:
+                    await self._report_error(context, e, link, user_info)
+                    error = e
+                self.metrics.count(link.platform, error)
+                progress['running'] -= 1
+                progress['sent' if error is None else 'failed'] += 1
+            await refresh()
+        
+        await refresh()
+        await asyncio.gather(*(run_item(link) for link in items))
+        await refresh(done=True)
+        
+        if progress['sent']:
+            await self._send_followup(update)
+    
+    async def perf_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Command untuk melihat latency per tahap (admin only)"""
+        user = update.effective_user
+        
+        if str(user.id) != self.config.ADMIN_ID:
+            await update.message.reply_text("❌ Command ini hanya untuk admin!")
+            return
+        
+        def rows(summary):
+            return "\n".join(
+                f"{name[:10]:<10} {count:>6} {p50:>7.2f} {p95:>7.2f} {p99:>7.2f}"
+                for name, (count, p50, p95, p99) in sorted(summary.items())
+            ) or "-"
+        
+        header = f"{'':<10} {'n':>6} {'p50':>7} {'p95':>7} {'p99':>7}"
+        results = {}
+        for (_, result, error), count in self.metrics.results().items():
+            # Underscore merusak parse Markdown di luar blok kode
+            name = 'success' if result == 'success' else error.replace('_', ' ')
+            results[name] = results.get(name, 0) + count
+        results_text = ", ".join(f"{name} {count}" for name, count in sorted(results.items())) or "-"
+        
+        perf_text = (
+            "⏱️ *REI ASSISTANT - Performance*\n\n"
+            "*Latency per tahap (detik):*\n"
+            f"```\n{header}\n{rows(self.metrics.stage_summary())}\n```\n"
+            "*Total per platform (detik):*\n"
+            f"```\n{header}\n{rows(self.metrics.platform_summary('total'))}\n```\n"
+            f"📊 *Hasil:* {results_text}\n"
+            f"⚙️ *Download:* {self.executor.pending} aktif, {self.executor.scheduler.waiting} antri\n"
+            f"💾 *Scratch:* {format_file_size(self.scratch.usage_bytes())}\n"
+            f"⏰ *Sejak:* {datetime.fromtimestamp(self.metrics.started).strftime('%Y-%m-%d %H:%M:%S')}"
+        )
+        await update.message.reply_text(perf_text, parse_mode='Markdown')
     
     async def broadcast_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Command untuk broadcast message ke semua users (admin only)"""
@@ -482,11 +963,14 @@ class ReiAssistantBot:
         
         broadcast_message = ' '.join(context.args)
         
+        # Simpan pesan dan daftar penerima, callback cukup membawa id broadcast
+        broadcast_id = await self.broadcasts.create(broadcast_message, self.users.user_ids())
+        
         # Send confirmation
         confirm_keyboard = [
             [
-                InlineKeyboardButton("✅ Ya, Broadcast", callback_data=f"confirm_broadcast_{hash(broadcast_message)}"),
-                InlineKeyboardButton("❌ Batalkan", callback_data="cancel_broadcast")
+                InlineKeyboardButton("✅ Ya, Broadcast", callback_data=f"confirm_broadcast_{broadcast_id}"),
+                InlineKeyboardButton("❌ Batalkan", callback_data=f"cancel_broadcast_{broadcast_id}")
             ]
         ]
         reply_markup = InlineKeyboardMarkup(confirm_keyboard)
@@ -494,7 +978,7 @@ class ReiAssistantBot:
         await update.message.reply_text(
             f"📢 *Konfirmasi Broadcast*\n\n"
             f"Message: {broadcast_message}\n\n"
-            f"*Akan dikirim ke:* {len(self.user_stats)} users\n"
+            f"*Akan dikirim ke:* {self.broadcasts.get(broadcast_id)['total']} users\n"
             f"*Anda yakin?*",
             parse_mode='Markdown',
             reply_markup=reply_markup
@@ -517,29 +1001,31 @@ class ReiAssistantBot:
             )
         elif data.startswith("confirm_broadcast_"):
             # Handle broadcast confirmation
-            await query.edit_message_text("⏳ Broadcasting message...")
-            success_count = 0
-            fail_count = 0
+            if str(query.from_user.id) != self.config.ADMIN_ID:
+                return
             
-            for user_id in self.user_stats.keys():
-                try:
-                    await context.bot.send_message(
-                        chat_id=user_id,
-                        text=f"📢 *Broadcast dari Admin*\n\n{query.message.text.split('Message: ')[1].split('\\n\\n')[0]}",
-                        parse_mode='Markdown'
-                    )
-                    success_count += 1
-                    await asyncio.sleep(0.1)  # Rate limiting
-                except Exception as e:
-                    logger.error(f"Failed to send broadcast to {user_id}: {e}")
-                    fail_count += 1
+            broadcast_id = int(data.rsplit('_', 1)[1])
+            job = self.broadcasts.get(broadcast_id)
+            if not job or job['status'] != 'draft':
+                await query.edit_message_text("⚠️ Broadcast ini sudah diproses atau dibatalkan.")
+                return
             
-            await query.edit_message_text(
-                f"✅ *Broadcast Selesai!*\n\n"
-                f"✅ Berhasil: {success_count} users\n"
-                f"❌ Gagal: {fail_count} users"
+            await query.edit_message_text("⏳ Broadcasting message...")
+            
+            # Kirim di background, progress di-update pada pesan konfirmasi ini
+            await self.broadcasts.start(
+                context.bot, broadcast_id,
+                chat_id=query.message.chat_id,
+                message_id=query.message.message_id,
+                on_blocked=self.users.remove
             )
-        elif data == "cancel_broadcast":
+        elif data.startswith("cancel_broadcast"):
+            if str(query.from_user.id) != self.config.ADMIN_ID:
+                return
+            
+            broadcast_id = data.rsplit('_', 1)[1]
+            if broadcast_id.isdigit():
+                await self.broadcasts.cancel(int(broadcast_id))
             await query.edit_message_text("❌ Broadcast dibatalkan.")
     
     async def error_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -554,7 +1040,7 @@ class ReiAssistantBot:
         )
         
         try:
-            await self.notify_admin(context, error_notification)
+            await self.notify_admin(context, error_notification, dedup_key=str(context.error)[:300])
         except:
             pass
         
@@ -569,16 +1055,74 @@ class ReiAssistantBot:
             except:
                 pass
     
-    def run(self):
-        """Jalankan Rei Assistant Bot"""
+    async def post_init(self, application: Application):
+        """Mulai background task setelah event loop berjalan"""
+        self.users.start()
+        self.limiter.start()
+        if Config.METRICS_PORT:
+            try:
+                self.metrics_server = await self.metrics.start_server(Config.METRICS_HOST, Config.METRICS_PORT)
+            except OSError as e:
+                logger.error(f"Failed to start metrics endpoint: {e}")
+        self.notifier.start(application.bot)
+        
+        # Lanjutkan broadcast yang terhenti karena restart
+        for broadcast_id in self.broadcasts.unfinished():
+            logger.info(f"Resuming broadcast {broadcast_id}")
+            await self.broadcasts.start(application.bot, broadcast_id, on_blocked=self.users.remove)
+        self.notifier.send(
+            "🚀 *REI ASSISTANT STARTUP*\n"
+            "Bot telah berhasil dijalankan!\n"
+            "*Timestamp:* " + datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        )
+    
+    async def post_stop(self, application: Application):
+        """Simpan progress broadcast dan kirim digest terakhir sebelum koneksi bot ditutup"""
+        await self.broadcasts.stop()
+        await self.notifier.stop()
+    
+    async def post_shutdown(self, application: Application):
+        """Bersihkan resource saat bot berhenti"""
+        await self.users.stop()
+        await self.limiter.stop()
+        if self.metrics_server:
+            self.metrics_server.close()
+            await self.metrics_server.wait_closed()
+        self.executor.shutdown()
+        if self.transcoder:
+            self.transcoder.shutdown()
+        self.file_cache.close()
+        self.meta_cache.close()
+    
+    def run(self, mode: str = None):
+        """Jalankan Rei Assistant Bot (mode "polling" atau "webhook", default dari Config)"""
+        mode = (mode or Config.BOT_MODE).lower()
+        if mode not in ("polling", "webhook"):
+            raise ValueError(f"Unknown BOT_MODE: {mode}")
+        if mode == "webhook" and not Config.WEBHOOK_URL:
+            raise ValueError("WEBHOOK_URL must be set for webhook mode")
+        
         try:
             # Create application
-            application = Application.builder().token(self.config.BOT_TOKEN).build()
+            builder = Application.builder().token(self.config.BOT_TOKEN)
+            if self.local_api:
+                base_url = Config.LOCAL_BOT_API_URL.rstrip('/')
+                builder = builder.base_url(f"{base_url}/bot").base_file_url(f"{base_url}/file/bot").local_mode(True)
+            
+            application = (
+                builder
+                .concurrent_updates(Config.CONCURRENT_UPDATES)
+                .post_init(self.post_init)
+                .post_stop(self.post_stop)
+                .post_shutdown(self.post_shutdown)
+                .build()
+            )
             
             # Add handlers
             application.add_handler(CommandHandler("start", self.start))
             application.add_handler(CommandHandler("help", self.help_command))
             application.add_handler(CommandHandler("stats", self.stats_command))
+            application.add_handler(CommandHandler("perf", self.perf_command))
             application.add_handler(CommandHandler("broadcast", self.broadcast_command))
             application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message))
             application.add_handler(CallbackQueryHandler(self.callback_handler))
@@ -587,23 +1131,30 @@ class ReiAssistantBot:
             application.add_error_handler(self.error_handler)
             
             # Jalankan bot
-            logger.info("🤖 Rei Assistant Bot starting...")
-            
-            # Kirim startup notification ke admin
-            startup_message = (
-                "🚀 *REI ASSISTANT STARTUP*\n"
-                "Bot telah berhasil dijalankan!\n"
-                "*Timestamp:* " + datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            )
+            logger.info(f"🤖 Rei Assistant Bot starting ({mode} mode)...")
             
-            # Note: We can't send notification here because we don't have context yet
-            # This will be sent after bot starts
+            # Startup notification ke admin dikirim dari post_init
             
-            application.run_polling(
-                allowed_updates=Update.ALL_TYPES,
-                drop_pending_updates=True,
-                close_loop=False
-            )
+            if mode == "webhook":
+                # Server async bawaan PTB: update langsung di-ACK lalu masuk queue Application,
+                # diproses paralel sesuai concurrent_updates
+                application.run_webhook(
+                    listen=Config.WEBHOOK_LISTEN,
+                    port=Config.WEBHOOK_PORT,
+                    url_path=Config.WEBHOOK_PATH,
+                    webhook_url=f"{Config.WEBHOOK_URL.rstrip('/')}/{Config.WEBHOOK_PATH}",
+                    secret_token=Config.WEBHOOK_SECRET or secrets.token_urlsafe(32),
+                    max_connections=Config.WEBHOOK_MAX_CONNECTIONS,
+                    allowed_updates=Update.ALL_TYPES,
+                    drop_pending_updates=True,
+                    close_loop=False
+                )
+            else:
+                application.run_polling(
+                    allowed_updates=Update.ALL_TYPES,
+                    drop_pending_updates=True,
+                    close_loop=False
+                )
             
         except Exception as e:
             logger.critical(f"Failed to start Rei Assistant Bot: {e}", exc_info=True)
@@ -0,0 +1,312 @@
+import time
+import asyncio
+import logging
+import threading
+
+from telegram.error import RetryAfter, Forbidden, BadRequest, NetworkError
+
+from cache import open_database
+
+logger = logging.getLogger(__name__)
+
+# Status pengiriman per user
+PENDING, SENT, FAILED, BLOCKED = 0, 1, 2, 3
+
+class TokenBucket:
+    """Token bucket global: maksimal `rate` pesan per detik dengan burst `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds):
+        """Tahan semua pengiriman (misal setelah RetryAfter dari Telegram)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._updated = self._paused_until
+        self._tokens = 0
+
+    async def acquire(self):
+        """Tunggu sampai ada token untuk satu pesan"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+class BroadcastManager:
+    """Broadcast ke semua user: pesan disimpan per id, progress di-checkpoint ke SQLite.
+
+    Pengiriman berjalan paralel dibatasi token bucket. Saat bot restart,
+    broadcast yang belum selesai dilanjutkan dari user yang belum terkirim
+    (user yang terkirim setelah checkpoint terakhir bisa menerima dua kali).
+    """
+
+    def __init__(self, path, rate=25, progress_interval=3, max_retries=5, draft_ttl=3600):
+        self.bucket = TokenBucket(rate)
+        self.workers = max(1, int(rate))
+        self.progress_interval = progress_interval
+        self.max_retries = max_retries
+        self.draft_ttl = draft_ttl
+        self._tasks = {}
+        # Semua penulisan berjalan di thread (to_thread) lewat self.conn dan lock ini;
+        # event loop hanya membaca lewat koneksi terpisah (WAL: tidak menunggu penulis)
+        self._write_lock = threading.Lock()
+
+        self.conn = open_database(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS broadcasts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                text TEXT NOT NULL,
+                status TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                sent INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                blocked INTEGER NOT NULL DEFAULT 0,
+                chat_id INTEGER,
+                message_id INTEGER,
+                created_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS broadcast_targets (
+                broadcast_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                state INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (broadcast_id, user_id)
+            )
+        """)
+        with self.conn:
+            self.conn.execute('BEGIN')
+            self._expire_drafts()
+        self.reader = open_database(path)
+
+    def _expire_drafts(self):
+        """Draft yang tidak dikonfirmasi / dibatalkan dalam draft_ttl: hapus daftar penerimanya"""
+        cutoff = time.time() - self.draft_ttl
+        self.conn.execute(
+            "DELETE FROM broadcast_targets WHERE broadcast_id IN "
+            "(SELECT id FROM broadcasts WHERE status = 'draft' AND created_at < ?)", (cutoff,)
+        )
+        self.conn.execute(
+            "UPDATE broadcasts SET status = 'expired' WHERE status = 'draft' AND created_at < ?", (cutoff,)
+        )
+
+    async def create(self, text, user_ids):
+        """Simpan draft broadcast beserta daftar penerimanya, return id broadcast"""
+        return await asyncio.to_thread(self._create, text, list(user_ids))
+
+    def _create(self, text, user_ids):
+        with self._write_lock, self.conn:
+            self.conn.execute('BEGIN')
+            self._expire_drafts()
+            cursor = self.conn.execute(
+                'INSERT INTO broadcasts (text, status, total, created_at) VALUES (?, ?, ?, ?)',
+                (text, 'draft', len(user_ids), time.time())
+            )
+            broadcast_id = cursor.lastrowid
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO broadcast_targets (broadcast_id, user_id) VALUES (?, ?)',
+                [(broadcast_id, user_id) for user_id in user_ids]
+            )
+        return broadcast_id
+
+    def get(self, broadcast_id):
+        """Data broadcast sebagai dict, None jika tidak ada"""
+        row = self.reader.execute(
+            'SELECT id, text, status, total, sent, failed, blocked, chat_id, message_id '
+            'FROM broadcasts WHERE id = ?', (broadcast_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ('id', 'text', 'status', 'total', 'sent', 'failed', 'blocked', 'chat_id', 'message_id')
+        return dict(zip(keys, row))
+
+    async def cancel(self, broadcast_id):
+        """Batalkan draft yang belum dikonfirmasi"""
+        return await asyncio.to_thread(self._cancel, broadcast_id)
+
+    def _cancel(self, broadcast_id):
+        with self._write_lock, self.conn:
+            self.conn.execute('BEGIN')
+            cursor = self.conn.execute(
+                "UPDATE broadcasts SET status = 'cancelled' WHERE id = ? AND status = 'draft'",
+                (broadcast_id,)
+            )
+            self.conn.execute('DELETE FROM broadcast_targets WHERE broadcast_id = ?', (broadcast_id,))
+        return cursor.rowcount > 0
+
+    def unfinished(self):
+        """Id broadcast yang terhenti di tengah jalan (misal karena restart)"""
+        return [row[0] for row in self.reader.execute(
+            "SELECT id FROM broadcasts WHERE status = 'running' ORDER BY id"
+        )]
+
+    def is_running(self, broadcast_id):
+        return broadcast_id in self._tasks
+
+    def _claim(self, broadcast_id, chat_id, message_id):
+        with self._write_lock:
+            cursor = self.conn.execute(
+                "UPDATE broadcasts SET status = 'running', "
+                "chat_id = COALESCE(?, chat_id), message_id = COALESCE(?, message_id) "
+                "WHERE id = ? AND status IN ('draft', 'running')",
+                (chat_id, message_id, broadcast_id)
+            )
+        return cursor.rowcount > 0
+
+    async def start(self, bot, broadcast_id, chat_id=None, message_id=None, on_blocked=None):
+        """Mulai (atau lanjutkan) broadcast di background, False jika sudah selesai / sedang jalan"""
+        if broadcast_id in self._tasks:
+            return False
+        claimed = await asyncio.to_thread(self._claim, broadcast_id, chat_id, message_id)
+        # Dicek ulang: start() lain untuk id yang sama bisa selesai lebih dulu saat menunggu
+        if not claimed or broadcast_id in self._tasks:
+            return False
+
+        task = asyncio.get_running_loop().create_task(self._run(bot, broadcast_id, on_blocked))
+        self._tasks[broadcast_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(broadcast_id, None))
+        return True
+
+    async def _deliver(self, bot, user_id, text):
+        """Kirim ke satu user, return status pengiriman"""
+        retries = 0
+        while True:
+            await self.bucket.acquire()
+            try:
+                await bot.send_message(chat_id=user_id, text=text, parse_mode='Markdown')
+                return SENT
+            except RetryAfter as e:
+                # Flood limit berlaku global, semua worker ikut menunggu
+                logger.warning(f"Broadcast flood limit hit, pausing for {e.retry_after}s")
+                self.bucket.pause(e.retry_after)
+            except Forbidden:
+                return BLOCKED
+            except BadRequest as e:
+                if 'chat not found' in str(e).lower():
+                    return BLOCKED
+                logger.error(f"Failed to send broadcast to {user_id}: {e}")
+                return FAILED
+            except NetworkError as e:
+                logger.warning(f"Network error sending broadcast to {user_id}: {e}")
+            except Exception as e:
+                logger.error(f"Failed to send broadcast to {user_id}: {e}")
+                return FAILED
+
+            retries += 1
+            if retries > self.max_retries:
+                return FAILED
+
+    def _checkpoint(self, broadcast_id, results, counts, status='running'):
+        """Tulis status user yang sudah diproses dan total sementara"""
+        with self._write_lock, self.conn:
+            self.conn.execute('BEGIN')
+            self.conn.executemany(
+                'UPDATE broadcast_targets SET state = ? WHERE broadcast_id = ? AND user_id = ?',
+                [(state, broadcast_id, user_id) for user_id, state in results]
+            )
+            self.conn.execute(
+                'UPDATE broadcasts SET sent = ?, failed = ?, blocked = ?, status = ? WHERE id = ?',
+                (counts[SENT], counts[FAILED], counts[BLOCKED], status, broadcast_id)
+            )
+            if status == 'done':
+                self.conn.execute('DELETE FROM broadcast_targets WHERE broadcast_id = ?', (broadcast_id,))
+
+    @staticmethod
+    def progress_text(job, counts, done=False):
+        processed = counts[SENT] + counts[FAILED] + counts[BLOCKED]
+        percent = processed / max(job['total'], 1) * 100
+        bar = '▓' * int(percent // 10) + '░' * (10 - int(percent // 10))
+        title = "✅ *Broadcast Selesai!*" if done else "📢 *Broadcast Berjalan...*"
+        return (
+            f"{title}\n\n"
+            f"{bar} {percent:.0f}%\n"
+            f"✅ Berhasil: {counts[SENT]} users\n"
+            f"❌ Gagal: {counts[FAILED]} users\n"
+            f"🚫 Block bot: {counts[BLOCKED]} users\n"
+            f"⏳ Sisa: {job['total'] - processed} users"
+        )
+
+    async def _report(self, bot, job, text):
+        if not job['chat_id'] or text == job.get('last_text'):
+            return
+        try:
+            await bot.edit_message_text(
+                chat_id=job['chat_id'], message_id=job['message_id'], text=text, parse_mode='Markdown'
+            )
+            job['last_text'] = text
+        except Exception as e:
+            logger.warning(f"Failed to update broadcast progress: {e}")
+
+    async def _run(self, bot, broadcast_id, on_blocked):
+        job = self.get(broadcast_id)
+        pending = [row[0] for row in self.reader.execute(
+            'SELECT user_id FROM broadcast_targets WHERE broadcast_id = ? AND state = ?',
+            (broadcast_id, PENDING)
+        )]
+        logger.info(f"Broadcast {broadcast_id}: {len(pending)} of {job['total']} users pending")
+
+        text = f"📢 *Broadcast dari Admin*\n\n{job['text']}"
+        counts = {SENT: job['sent'], FAILED: job['failed'], BLOCKED: job['blocked']}
+        results = []
+        targets = iter(pending)
+
+        async def worker():
+            for user_id in targets:
+                state = await self._deliver(bot, user_id, text)
+                results.append((user_id, state))
+                counts[state] += 1
+                if state == BLOCKED and on_blocked:
+                    on_blocked(user_id)
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(self.workers, len(pending)))]
+        try:
+            while True:
+                done = set()
+                if workers:
+                    done, _ = await asyncio.wait(workers, timeout=self.progress_interval)
+                for task in done:
+                    workers.remove(task)
+                    if not task.cancelled() and task.exception():
+                        logger.error(f"Broadcast {broadcast_id} worker crashed: {task.exception()}")
+
+                batch, results[:] = results[:], []
+                status = 'running' if workers else 'done'
+                await asyncio.to_thread(self._checkpoint, broadcast_id, batch, dict(counts), status)
+                await self._report(bot, job, self.progress_text(job, counts, done=not workers))
+                if not workers:
+                    break
+        finally:
+            # Dibatalkan (bot berhenti): simpan progress agar bisa dilanjutkan
+            if workers:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                self._checkpoint(broadcast_id, results, counts)
+
+        logger.info(
+            f"Broadcast {broadcast_id} finished: {counts[SENT]} sent, "
+            f"{counts[FAILED]} failed, {counts[BLOCKED]} blocked"
+        )
+        return counts
+
+    async def stop(self):
+        """Hentikan broadcast yang berjalan (progress tersimpan) lalu tutup database"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.reader.close()
+        self.conn.close()
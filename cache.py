@@ -0,0 +1,278 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+
+from urls import normalize_url
+
+logger = logging.getLogger(__name__)
+
+def open_database(path):
+    """Buka koneksi SQLite (WAL) dan buat folder jika belum ada"""
+    folder = os.path.dirname(path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+class FileIdCache:
+    """Cache file_id Telegram per (extractor, video id) dengan batas ukuran, LRU dan TTL"""
+
+    def __init__(self, path, max_entries=10000, ttl=30 * 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        self.conn = open_database(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS file_ids (
+                extractor TEXT NOT NULL,
+                video_id TEXT NOT NULL,
+                file_id TEXT NOT NULL,
+                title TEXT,
+                platform TEXT,
+                file_size INTEGER,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (extractor, video_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_file_ids_last_used ON file_ids (last_used);
+            CREATE TABLE IF NOT EXISTS file_id_urls (
+                url TEXT PRIMARY KEY,
+                extractor TEXT NOT NULL,
+                video_id TEXT NOT NULL
+            );
+        """)
+        self._size = self.conn.execute('SELECT COUNT(*) FROM file_ids').fetchone()[0]
+        logger.info(f"File id cache loaded: {self._size} entries from {path}")
+
+    @staticmethod
+    def make_key(info):
+        """Key cache dari info dict yt-dlp"""
+        extractor = info.get('extractor_key') or info.get('extractor') or 'generic'
+        return extractor.lower(), str(info.get('id'))
+
+    def _lookup(self, extractor, video_id):
+        row = self.conn.execute(
+            'SELECT file_id, title, platform, file_size, created_at '
+            'FROM file_ids WHERE extractor = ? AND video_id = ?',
+            (extractor, video_id)
+        ).fetchone()
+        if not row:
+            return None
+
+        now = time.time()
+        if self.ttl and now - row[4] > self.ttl:
+            self.conn.execute(
+                'DELETE FROM file_ids WHERE extractor = ? AND video_id = ?',
+                (extractor, video_id)
+            )
+            self._size -= 1
+            return None
+
+        self.conn.execute(
+            'UPDATE file_ids SET last_used = ? WHERE extractor = ? AND video_id = ?',
+            (now, extractor, video_id)
+        )
+        return {
+            'file_id': row[0],
+            'title': row[1],
+            'platform': row[2],
+            'file_size': row[3],
+            'key': (extractor, video_id)
+        }
+
+    def get(self, extractor, video_id):
+        """Ambil entry cache, None jika tidak ada / expired"""
+        entry = self._lookup(extractor, video_id)
+        if entry:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return entry
+
+    def get_by_url(self, url):
+        """Ambil entry cache lewat URL yang pernah dikirim user (tanpa yt-dlp)"""
+        row = self.conn.execute(
+            'SELECT extractor, video_id FROM file_id_urls WHERE url = ?', (url,)
+        ).fetchone()
+        entry = self._lookup(*row) if row else None
+        if entry:
+            self.hits += 1
+        return entry
+
+    def remember_url(self, url, extractor, video_id):
+        """Catat URL sebagai alias dari (extractor, video id)"""
+        self.conn.execute(
+            'INSERT OR REPLACE INTO file_id_urls (url, extractor, video_id) VALUES (?, ?, ?)',
+            (url, extractor, video_id)
+        )
+
+    def put(self, extractor, video_id, file_id, title=None, platform=None, file_size=None):
+        """Simpan file_id hasil upload ke Telegram"""
+        now = time.time()
+        exists = self.conn.execute(
+            'SELECT 1 FROM file_ids WHERE extractor = ? AND video_id = ?',
+            (extractor, video_id)
+        ).fetchone()
+
+        self.conn.execute(
+            'INSERT OR REPLACE INTO file_ids '
+            '(extractor, video_id, file_id, title, platform, file_size, created_at, last_used) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (extractor, video_id, file_id, title, platform, file_size, now, now)
+        )
+        if not exists:
+            self._size += 1
+
+        if self._size > self.max_entries:
+            self._evict()
+
+    def invalidate(self, extractor, video_id):
+        """Hapus entry (misal file_id ditolak Telegram)"""
+        cur = self.conn.execute(
+            'DELETE FROM file_ids WHERE extractor = ? AND video_id = ?',
+            (extractor, video_id)
+        )
+        self._size -= cur.rowcount
+
+    def _evict(self):
+        """Hapus entry paling lama tidak dipakai (LRU), sekaligus 10% agar jarang terjadi"""
+        target = int(self.max_entries * 0.9)
+        self.conn.execute(
+            'DELETE FROM file_ids WHERE rowid IN ('
+            'SELECT rowid FROM file_ids ORDER BY last_used ASC LIMIT ?)',
+            (self._size - target,)
+        )
+        self.conn.execute(
+            'DELETE FROM file_id_urls WHERE NOT EXISTS ('
+            'SELECT 1 FROM file_ids f WHERE f.extractor = file_id_urls.extractor '
+            'AND f.video_id = file_id_urls.video_id)'
+        )
+        self._size = self.conn.execute('SELECT COUNT(*) FROM file_ids').fetchone()[0]
+        logger.info(f"File id cache evicted down to {self._size} entries")
+
+    def stats(self):
+        """Statistik hit / miss untuk /stats admin"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / lookups * 100) if lookups else 0.0,
+            'entries': self._size
+        }
+
+    def close(self):
+        self.conn.close()
+
+class MetadataCache:
+    """Cache hasil extract yt-dlp per URL dengan TTL, negative caching dan SQLite opsional"""
+
+    # Field info dict yang besar tapi tidak dibutuhkan untuk download
+    HEAVY_FIELDS = ('automatic_captions', 'subtitles', 'thumbnails', 'heatmap', 'chapters')
+
+    def __init__(self, max_entries=256, ttl=1800, error_ttl=300, path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.conn = None
+        if path:
+            self.conn = open_database(path)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS metadata (
+                    url TEXT PRIMARY KEY,
+                    ok INTEGER NOT NULL,
+                    payload TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            self.conn.execute('DELETE FROM metadata WHERE expires_at < ?', (time.time(),))
+
+    def get(self, url):
+        """Return (ok, payload) jika ada di cache, None jika tidak ada / expired"""
+        key = normalize_url(url)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self.conn is not None:
+                row = self.conn.execute(
+                    'SELECT expires_at, ok, payload FROM metadata WHERE url = ?', (key,)
+                ).fetchone()
+                if row:
+                    entry = (row[0], bool(row[1]), json.loads(row[2]))
+                    self._remember(key, entry)
+
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    self._forget(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, url, video_info):
+        """Simpan hasil extract yang berhasil"""
+        info = video_info.get('info')
+        if info:
+            video_info = dict(video_info, info={
+                k: v for k, v in info.items() if k not in self.HEAVY_FIELDS
+            })
+        self._store(normalize_url(url), True, video_info, self.ttl)
+
+    def put_error(self, url, error):
+        """Simpan kegagalan (video private, 404, dll) dengan TTL lebih pendek"""
+        self._store(normalize_url(url), False, str(error), self.error_ttl)
+
+    def _store(self, key, ok, payload, ttl):
+        entry = (time.time() + ttl, ok, payload)
+        with self._lock:
+            self._remember(key, entry)
+            if self.conn is not None:
+                try:
+                    self.conn.execute(
+                        'INSERT OR REPLACE INTO metadata (url, ok, payload, expires_at) VALUES (?, ?, ?, ?)',
+                        (key, int(ok), json.dumps(payload, default=str), entry[0])
+                    )
+                except Exception as e:
+                    logger.error(f"Failed to persist metadata for {key}: {e}")
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _forget(self, key):
+        self._entries.pop(key, None)
+        if self.conn is not None:
+            self.conn.execute('DELETE FROM metadata WHERE url = ?', (key,))
+
+    def stats(self):
+        """Statistik hit / miss untuk /stats admin"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / lookups * 100) if lookups else 0.0,
+            'entries': len(self._entries)
+        }
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
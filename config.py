@@ -10,15 +10,115 @@ class Config:
     # ID Admin untuk notifikasi error
     ADMIN_ID = os.getenv("ADMIN_ID", "7291292815")
     
+    # Mode menerima update: "polling" atau "webhook"
+    BOT_MODE = os.getenv("BOT_MODE", "polling")
+
+    # Webhook: URL publik (https) yang diteruskan ke WEBHOOK_LISTEN:WEBHOOK_PORT
+    WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+    WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram")
+    WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+    WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", os.getenv("PORT", "8443")))
+    # Secret header dari Telegram (kosong = dibuat acak setiap start)
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+    # Jumlah koneksi paralel Telegram ke webhook (maks 100)
+    WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "100"))
+    
     # Config untuk logging
     LOG_LEVEL = "INFO"
+
+    # Tulis activity log juga dalam format JSON lines (logs/rei_activity_*.jsonl)
+    ACTIVITY_LOG_JSON = os.getenv("ACTIVITY_LOG_JSON", "false").lower() in ("1", "true", "yes")
+    
+    # Terima link dari situs selain platform yang didukung (dicoba lewat yt-dlp)
+    ALLOW_OTHER_SITES = os.getenv("ALLOW_OTHER_SITES", "false").lower() in ("1", "true", "yes")
     
     # Max file size untuk Telegram (50MB)
     MAX_FILE_SIZE = 50 * 1024 * 1024
     
+    # Server Bot API lokal (telegram-bot-api --local), misal http://localhost:8081
+    # Harus bisa membaca SCRATCH_DIR (host / volume yang sama). Kosong = API publik.
+    LOCAL_BOT_API_URL = os.getenv("LOCAL_BOT_API_URL", "")
+    # Batas ukuran file saat memakai server lokal (maks 2000MB)
+    LOCAL_MAX_FILE_SIZE = int(os.getenv("LOCAL_MAX_FILE_SIZE", str(2000 * 1024 * 1024)))
+    
     # Timeout download
     DOWNLOAD_TIMEOUT = 300
-    
+
+    # Worker pool untuk yt-dlp ("thread" atau "process")
+    DOWNLOAD_POOL = os.getenv("DOWNLOAD_POOL", "thread")
+    DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "4"))
+
+    # Batas job aktif per user dan panjang antrian global
+    MAX_DOWNLOADS_PER_USER = int(os.getenv("MAX_DOWNLOADS_PER_USER", "2"))
+    DOWNLOAD_QUEUE_SIZE = int(os.getenv("DOWNLOAD_QUEUE_SIZE", "50"))
+    # User premium (ID dipisah koma): bersama admin memakai lane prioritas antrian download
+    PREMIUM_USERS = [int(user_id) for user_id in os.getenv("PREMIUM_USERS", "").split(",") if user_id.strip()]
+
+    # Folder kerja download (satu subfolder per job) dan budget disk-nya
+    SCRATCH_DIR = os.getenv("SCRATCH_DIR", "downloads")
+    SCRATCH_MAX_BYTES = int(os.getenv("SCRATCH_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+    SCRATCH_MIN_FREE_BYTES = int(os.getenv("SCRATCH_MIN_FREE_BYTES", str(500 * 1024 * 1024)))
+
+    # Video melebihi batas: "reencode" (kompres ffmpeg), "split" (potong per part) atau "off"
+    OVERSIZE_MODE = os.getenv("OVERSIZE_MODE", "off").lower()
+    # Batas download mentah untuk video yang akan dikompres / dipotong
+    OVERSIZE_MAX_DOWNLOAD = int(os.getenv("OVERSIZE_MAX_DOWNLOAD", str(500 * 1024 * 1024)))
+    # Process pool ffmpeg (terpisah dari worker download) dan batas CPU time per job (detik)
+    TRANSCODE_WORKERS = int(os.getenv("TRANSCODE_WORKERS", "1"))
+    TRANSCODE_QUEUE_SIZE = int(os.getenv("TRANSCODE_QUEUE_SIZE", "5"))
+    TRANSCODE_CPU_LIMIT = int(os.getenv("TRANSCODE_CPU_LIMIT", "600"))
+
+    # Video single-file sampai ukuran ini didownload ke memori, bukan disk (0 = nonaktif)
+    MEMORY_DOWNLOAD_MAX_BYTES = int(os.getenv("MEMORY_DOWNLOAD_MAX_BYTES", str(8 * 1024 * 1024)))
+
+    # Batch: maksimal video per pesan (banyak link / playlist) dan yang diproses bersamaan
+    BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "10"))
+    BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "2"))
+
+    # Jeda minimal antar edit pesan progress download / upload (detik)
+    PROGRESS_INTERVAL = float(os.getenv("PROGRESS_INTERVAL", "3"))
+
+    # Jumlah update Telegram yang boleh diproses bersamaan
+    CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "256"))
+
+    # Folder data persisten (cache, database)
+    DATA_DIR = os.getenv("DATA_DIR", "data")
+
+    # Cache file_id Telegram untuk video yang pernah diupload
+    FILE_CACHE_PATH = os.getenv("FILE_CACHE_PATH", os.path.join(DATA_DIR, "file_cache.db"))
+    FILE_CACHE_MAX_ENTRIES = int(os.getenv("FILE_CACHE_MAX_ENTRIES", "20000"))
+    FILE_CACHE_TTL = int(os.getenv("FILE_CACHE_TTL", str(30 * 24 * 3600)))
+
+    # Cache hasil extract yt-dlp (kosongkan path untuk cache memori saja)
+    META_CACHE_PATH = os.getenv("META_CACHE_PATH", os.path.join(DATA_DIR, "metadata_cache.db"))
+    META_CACHE_MAX_ENTRIES = int(os.getenv("META_CACHE_MAX_ENTRIES", "256"))
+    META_CACHE_TTL = int(os.getenv("META_CACHE_TTL", "1800"))
+    META_CACHE_ERROR_TTL = int(os.getenv("META_CACHE_ERROR_TTL", "300"))
+
+    # Notifikasi admin: digest tiap N detik, error kritis identik hanya sekali per window
+    ADMIN_DIGEST_INTERVAL = int(os.getenv("ADMIN_DIGEST_INTERVAL", "300"))
+    ADMIN_ERROR_DEDUP_WINDOW = int(os.getenv("ADMIN_ERROR_DEDUP_WINDOW", "60"))
+
+    # Database statistik user (flush batch tiap N detik)
+    USER_DB_PATH = os.getenv("USER_DB_PATH", os.path.join(DATA_DIR, "users.db"))
+    USER_FLUSH_INTERVAL = float(os.getenv("USER_FLUSH_INTERVAL", "5"))
+
+    # Broadcast: batas pesan per detik (limit Telegram sekitar 30/detik)
+    BROADCAST_DB_PATH = os.getenv("BROADCAST_DB_PATH", os.path.join(DATA_DIR, "broadcasts.db"))
+    BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", "25"))
+
+    # Rate limit (token bucket): link per menit per user dan burst-nya (0 = nonaktif)
+    RATE_LIMIT_USER_PER_MINUTE = float(os.getenv("RATE_LIMIT_USER_PER_MINUTE", "10"))
+    RATE_LIMIT_USER_BURST = int(os.getenv("RATE_LIMIT_USER_BURST", "5"))
+    # Extraction keluar per platform untuk seluruh bot, format "platform:per_menit,..."
+    RATE_LIMIT_PLATFORMS = os.getenv("RATE_LIMIT_PLATFORMS", "instagram:20,facebook:30")
+    # Simpan bucket agar restart tidak mereset limit (kosong = hanya di memori)
+    RATE_LIMIT_DB_PATH = os.getenv("RATE_LIMIT_DB_PATH", os.path.join(DATA_DIR, "ratelimit.db"))
+
+    # Endpoint metrik Prometheus (GET /metrics), hanya lokal secara default (port 0 = nonaktif)
+    METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+
     # Iklan (bisa diubah)
     ADS_MESSAGE = """
     ⚡ *Download Selesai!*
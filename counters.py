@@ -0,0 +1,132 @@
+import json
+import time
+from datetime import date, datetime, timedelta
+from collections import OrderedDict
+
+class DayBucket:
+    """Counter untuk satu hari"""
+
+    __slots__ = ('day', 'active', 'new', 'downloads', 'failures', 'platforms', 'failed_platforms')
+
+    def __init__(self, day, active=0, new=0, downloads=0, failures=0, platforms=None, failed_platforms=None):
+        self.day = day
+        self.active = active
+        self.new = new
+        self.downloads = downloads
+        self.failures = failures
+        self.platforms = platforms or {}
+        self.failed_platforms = failed_platforms or {}
+
+    def as_row(self):
+        return (self.day, self.active, self.new, self.downloads, self.failures,
+                json.dumps(self.platforms), json.dumps(self.failed_platforms))
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(row[0], row[1], row[2], row[3], row[4], json.loads(row[5]), json.loads(row[6]))
+
+class StatsCounters:
+    """Counter statistik admin yang di-update saat event terjadi (bukan scan semua user)"""
+
+    def __init__(self, history_days=30):
+        self.history_days = history_days
+        self.total_users = 0
+        self.total_downloads = 0
+        self._days = OrderedDict()
+        self._dirty = set()
+        self._day_start = 0
+        self._day_end = 0
+        self._today = None
+
+    def load(self, rows):
+        """Muat bucket harian dari database"""
+        for row in sorted(rows):
+            bucket = DayBucket.from_row(row)
+            self._days[bucket.day] = bucket
+        self._trim()
+
+    def _rollover(self, now):
+        today = date.fromtimestamp(now)
+        self._day_start = datetime.combine(today, datetime.min.time()).timestamp()
+        self._day_end = (datetime.combine(today, datetime.min.time()) + timedelta(days=1)).timestamp()
+
+        key = today.isoformat()
+        self._today = self._days.get(key)
+        if self._today is None:
+            self._today = self._days[key] = DayBucket(key)
+        self._trim()
+
+    def cutoff(self, today=None):
+        """Hari tertua (ISO) yang masih disimpan: history_days hari kalender terakhir"""
+        today = today or date.today()
+        return (today - timedelta(days=self.history_days - 1)).isoformat()
+
+    def _trim(self):
+        # Bucket urut dari hari terlama; buang berdasarkan tanggal, bukan jumlah bucket
+        cutoff = self.cutoff(date.fromisoformat(self._today.day) if self._today else None)
+        while self._days and next(iter(self._days)) < cutoff:
+            self._days.popitem(last=False)
+
+    def today(self, now=None):
+        """Bucket hari ini, otomatis ganti hari saat lewat tengah malam"""
+        now = now or time.time()
+        if not (self._day_start <= now < self._day_end):
+            self._rollover(now)
+        return self._today
+
+    def user_seen(self, is_new, previous_last_seen):
+        """User mengirim pesan / command"""
+        bucket = self.today()
+        if is_new:
+            self.total_users += 1
+            bucket.new += 1
+            bucket.active += 1
+        elif previous_last_seen < self._day_start:
+            bucket.active += 1
+        else:
+            return
+        self._dirty.add(bucket.day)
+
+    def user_removed(self, downloads=0):
+        """User dihapus: total download ikut berkurang agar sama dengan hasil load dari tabel users"""
+        self.total_users -= 1
+        self.total_downloads -= downloads
+
+    def download(self, platform):
+        bucket = self.today()
+        self.total_downloads += 1
+        bucket.downloads += 1
+        bucket.platforms[platform] = bucket.platforms.get(platform, 0) + 1
+        self._dirty.add(bucket.day)
+
+    def failure(self, platform):
+        bucket = self.today()
+        bucket.failures += 1
+        bucket.failed_platforms[platform] = bucket.failed_platforms.get(platform, 0) + 1
+        self._dirty.add(bucket.day)
+
+    def history(self, days):
+        """Bucket N hari kalender terakhir (terbaru dulu), hari tanpa event berisi nol"""
+        today = date.fromisoformat(self.today().day)
+        keys = [(today - timedelta(days=i)).isoformat() for i in range(days)]
+        return [self._days.get(day) or DayBucket(day) for day in keys]
+
+    def summary(self, days):
+        """Total N hari terakhir"""
+        result = {'new': 0, 'downloads': 0, 'failures': 0, 'platforms': {}}
+        for bucket in self.history(days):
+            result['new'] += bucket.new
+            result['downloads'] += bucket.downloads
+            result['failures'] += bucket.failures
+            for platform, count in bucket.platforms.items():
+                result['platforms'][platform] = result['platforms'].get(platform, 0) + count
+        return result
+
+    def pending_rows(self):
+        """Bucket yang berubah sejak flush terakhir"""
+        rows = [self._days[day].as_row() for day in self._dirty if day in self._days]
+        self._dirty.clear()
+        return rows
+
+    def mark_dirty(self, rows):
+        self._dirty.update(row[0] for row in rows)
@@ -1,82 +1,379 @@
 import os
-import re
+import copy
+import time
+import shutil
+import tempfile
 import subprocess
+import urllib.request
 import yt_dlp
+from yt_dlp.cookies import LenientSimpleCookie
 from pytube import YouTube
 from utils import clean_filename, format_file_size
+import urls
 import logging
 
 logger = logging.getLogger(__name__)
 
+PLAYLIST_ERROR = "Link playlist tidak didukung, kirim link satu video"
+
+class BufferedVideo:
+    """Video hasil download di buffer memori, dipakai pengganti path file"""
+    
+    def __init__(self, buffer, filename, size):
+        self.buffer = buffer
+        self.filename = filename
+        self.size = size
+    
+    def close(self):
+        self.buffer.close()
+
 class VideoDownloader:
-    def __init__(self, max_size=50*1024*1024):
+    # Estimasi dari filesize_approx / bitrate bisa meleset, beri cadangan 10%
+    APPROX_MARGIN = 1.1
+    
+    # Format yang bisa diambil langsung lewat HTTP tanpa yt-dlp
+    DIRECT_PROTOCOLS = ('http', 'https')
+    
+    def __init__(self, max_size=50*1024*1024, meta_cache=None, memory_threshold=0, download_limit=None):
         self.max_size = max_size
+        # Batas download mentah; di atas max_size hasilnya dikompres / dipotong dulu
+        self.download_limit = max(download_limit or max_size, max_size)
+        self.meta_cache = meta_cache
+        # Video single-file <= threshold didownload ke memori (0 = nonaktif)
+        self.memory_threshold = memory_threshold
         self.ydl_opts = {
             'quiet': True,
             'no_warnings': True,
             'extract_flat': False,
+            # Link video di dalam playlist (watch?v=..&list=..) hanya ambil videonya
+            'noplaylist': True,
             'cookiefile': None,  # Tidak menggunakan cookie
             'http_headers': {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             },
-            'format': 'best[filesize<50M]',  # Max 50MB untuk Telegram
+            # Format final dipilih plan_format() sebelum download
+            'format': 'bv*+ba/b',
         }
+        self.can_merge = shutil.which('ffmpeg') is not None
+    
+    def __getstate__(self):
+        # Cache metadata (lock + koneksi SQLite) tidak bisa dikirim ke process pool,
+        # cache hanya dipakai di proses utama
+        state = self.__dict__.copy()
+        state['meta_cache'] = None
+        return state
     
     def get_platform(self, url):
-        """Deteksi platform dari URL"""
-        patterns = {
-            'youtube': r'(youtube\.com|youtu\.be)',
-            'tiktok': r'tiktok\.com',
-            'instagram': r'instagram\.com',
-            'facebook': r'facebook\.com|fb\.watch',
-            'twitter': r'twitter\.com|x\.com',
+        """Deteksi platform dari hostname URL"""
+        return urls.get_platform(url)
+    
+    def _extract(self, url):
+        """Extract info dari yt-dlp, return (info, error)"""
+        try:
+            with yt_dlp.YoutubeDL(self.ydl_opts) as ydl:
+                return ydl.extract_info(url, download=False), None
+        except Exception as e:
+            logger.error(f"Info error: {str(e)}")
+            return None, str(e)
+    
+    def resolve(self, url):
+        """Resolve halaman video sekali, hasilnya dipakai ulang untuk info dan download"""
+        info, _ = self._extract(url)
+        return info
+    
+    def summarize(self, info, url=None):
+        """Ringkas info dict yt-dlp untuk ditampilkan ke user, None jika bukan video tunggal"""
+        if info.get('_type') == 'playlist':
+            return None
+        url = url or info.get('webpage_url') or info.get('original_url', '')
+        return {
+            'title': info.get('title', 'Unknown'),
+            'duration': info.get('duration', 0),
+            'thumbnail': info.get('thumbnail', ''),
+            'platform': self.get_platform(url),
+            'info': info
         }
+    
+    @staticmethod
+    def estimate_size(fmt, duration=None):
+        """Perkiraan ukuran format dalam byte, return (size, exact) atau (None, False)"""
+        if fmt.get('filesize'):
+            return fmt['filesize'], True
+        if fmt.get('filesize_approx'):
+            return fmt['filesize_approx'], False
         
-        for platform, pattern in patterns.items():
-            if re.search(pattern, url, re.IGNORECASE):
-                return platform
-        return 'unknown'
+        # tbr dalam kbit/s
+        tbr = fmt.get('tbr') or ((fmt.get('vbr') or 0) + (fmt.get('abr') or 0))
+        if tbr and duration:
+            return int(tbr * 1000 / 8 * duration), False
+        return None, False
     
-    def download_video(self, url, platform=None):
-        """Download video dari berbagai platform"""
+    def _fits(self, size, exact):
+        return size <= self.max_size if exact else size * self.APPROX_MARGIN <= self.max_size
+    
+    def plan_format(self, info):
+        """Pilih format video+audio terbaik yang muat di max_size tanpa download apa pun.
+        
+        Return (plan, None) dengan plan = {'format', 'size', 'exact', 'oversize'}, atau (None, pesan error).
+        Jika tidak ada yang muat tapi download_limit lebih besar, dipilih format terkecil
+        dengan oversize=True (harus dikompres / dipotong setelah download).
+        """
+        if info.get('_type') == 'playlist':
+            return None, PLAYLIST_ERROR
+        
+        formats = info.get('formats')
+        if not formats:
+            # Extractor tanpa daftar format: hanya bisa dicek dari info utama
+            size, exact = self.estimate_size(info, info.get('duration'))
+            if size and not self._fits(size, exact):
+                if size <= self.download_limit:
+                    return {'format': None, 'size': size, 'exact': exact, 'oversize': True}, None
+                return None, (
+                    f"Video terlalu besar (±{format_file_size(size)}, "
+                    f"batas {format_file_size(self.max_size)})"
+                )
+            return {'format': None, 'size': size, 'exact': exact, 'oversize': False}, None
+        
+        duration = info.get('duration')
+        combined, videos, audios = [], [], []
+        for fmt in formats:
+            if fmt.get('ext') == 'mhtml' or not fmt.get('format_id'):
+                continue  # storyboard
+            has_video = fmt.get('vcodec') != 'none'
+            has_audio = fmt.get('acodec') != 'none'
+            size, exact = self.estimate_size(fmt, duration)
+            entry = (fmt, size, exact)
+            if has_video and has_audio:
+                combined.append(entry)
+            elif has_video:
+                videos.append(entry)
+            elif has_audio:
+                audios.append(entry)
+        
+        def score(video, audio=None):
+            # Resolusi dulu, lalu mp4 (bisa di-stream Telegram), lalu bitrate
+            tbr = (video.get('tbr') or 0) + ((audio or {}).get('tbr') or 0)
+            return (video.get('height') or 0, video.get('ext') == 'mp4', tbr)
+        
+        candidates = []
+        unknown = []
+        sized = []
+        for fmt, size, exact in combined:
+            if size is None:
+                unknown.append((score(fmt), fmt['format_id']))
+                continue
+            sized.append((size, exact, fmt['format_id']))
+            if self._fits(size, exact):
+                candidates.append((score(fmt), fmt['format_id'], size, exact))
+        
+        # Gabungan video-only + audio-only butuh ffmpeg untuk merge
+        if self.can_merge:
+            for video, video_size, video_exact in videos:
+                for audio, audio_size, audio_exact in audios:
+                    if video_size is None or audio_size is None:
+                        continue
+                    size, exact = video_size + audio_size, video_exact and audio_exact
+                    format_id = f"{video['format_id']}+{audio['format_id']}"
+                    sized.append((size, exact, format_id))
+                    if self._fits(size, exact):
+                        candidates.append((score(video, audio), format_id, size, exact))
+        
+        if candidates:
+            _, format_id, size, exact = max(candidates, key=lambda c: c[0])
+            return {'format': format_id, 'size': size, 'exact': exact, 'oversize': False}, None
+        
+        if unknown:
+            # Ukuran tidak diketahui: coba yang terbaik, dibatasi max_filesize saat download
+            _, format_id = max(unknown, key=lambda c: c[0])
+            return {'format': format_id, 'size': None, 'exact': False, 'oversize': False}, None
+        
+        if sized:
+            size, exact, format_id = min(sized)
+            if size <= self.download_limit:
+                return {'format': format_id, 'size': size, 'exact': exact, 'oversize': True}, None
+            return None, (
+                f"Video terlalu besar (format terkecil ±{format_file_size(size)}, "
+                f"batas {format_file_size(self.max_size)})"
+            )
+        return None, "Tidak ada format video yang bisa didownload"
+    
+    def _memory_format(self, info, plan):
+        """Format yang boleh didownload ke memori, None jika harus lewat disk"""
+        if not self.memory_threshold or not plan['size'] or plan['size'] > self.memory_threshold:
+            return None
+        if plan['format'] is None:
+            fmt = info
+        elif '+' in plan['format']:
+            return None  # perlu merge ffmpeg
+        else:
+            fmt = next((f for f in info.get('formats') or [] if f.get('format_id') == plan['format']), None)
+        
+        if not fmt or not fmt.get('url') or fmt.get('protocol', 'https') not in self.DIRECT_PROTOCOLS:
+            return None
+        return fmt
+    
+    def _download_to_memory(self, info, fmt, output_dir, progress_hook=None):
+        """Stream format ke SpooledTemporaryFile (pindah ke disk job jika ternyata besar)"""
+        headers = dict(fmt.get('http_headers') or self.ydl_opts['http_headers'])
+        # yt-dlp tidak menaruh cookie di http_headers, tapi di field cookies
+        # (format Set-Cookie, sudah disaring untuk URL format ini)
+        cookies = fmt.get('cookies') or info.get('cookies')
+        if cookies:
+            headers['Cookie'] = '; '.join(
+                f"{name}={morsel.coded_value}" for name, morsel in LenientSimpleCookie(cookies).items()
+            )
+        buffer = tempfile.SpooledTemporaryFile(max_size=self.memory_threshold, dir=output_dir)
+        try:
+            size = 0
+            request = urllib.request.Request(fmt['url'], headers=headers)
+            started = time.monotonic()
+            with urllib.request.urlopen(request, timeout=30) as response:
+                total = int(response.headers.get('Content-Length') or 0) or None
+                for chunk in iter(lambda: response.read(64 * 1024), b''):
+                    size += len(chunk)
+                    if size > self.max_size:
+                        raise ValueError(f"File terlalu besar (>{format_file_size(self.max_size)})")
+                    buffer.write(chunk)
+                    if progress_hook:
+                        # Format status sama dengan progress_hooks yt-dlp
+                        speed = size / max(time.monotonic() - started, 0.001)
+                        progress_hook({
+                            'status': 'downloading',
+                            'downloaded_bytes': size,
+                            'total_bytes': total,
+                            'speed': speed,
+                            'eta': (total - size) / speed if total else None
+                        })
+            buffer.seek(0)
+        except Exception:
+            buffer.close()
+            raise
+        
+        filename = clean_filename(f"{info.get('title', 'video')} [{info.get('id', '')}]") + f".{fmt.get('ext', 'mp4')}"
+        return BufferedVideo(buffer, filename, size)
+    
+    def _downloaded_path(self, ydl, result):
+        """Path file hasil download menurut yt-dlp (bukan tebakan dari judul)"""
+        for download in result.get('requested_downloads') or []:
+            if download.get('filepath'):
+                return download['filepath']
+        return ydl.prepare_filename(result)
+    
+    def download_info(self, info, platform=None, output_dir='.', progress_hook=None):
+        """Download dari info dict hasil resolve() tanpa request ulang ke halaman.
+        
+        progress_hook menerima dict status ala progress_hooks yt-dlp.
+        Return (path atau BufferedVideo, status), atau (None, pesan error).
+        """
         try:
             if not platform:
-                platform = self.get_platform(url)
+                platform = self.get_platform(info.get('webpage_url', ''))
             
-            logger.info(f"Downloading from {platform}: {url}")
+            logger.info(f"Downloading from {platform}: {info.get('webpage_url', info.get('id'))}")
+            
+            # Pilih format yang muat sebelum download, gagal cepat jika tidak ada
+            plan, error = self.plan_format(info)
+            if not plan:
+                return None, error
+            
+            # Klip kecil single-file: langsung ke memori, tanpa tulis-baca disk
+            fmt = self._memory_format(info, plan)
+            if fmt:
+                try:
+                    return self._download_to_memory(info, fmt, output_dir, progress_hook), "Success"
+                except Exception as e:
+                    logger.warning(f"In-memory download failed, falling back to disk: {e}")
+            
+            # Download langsung dari format yang sudah di-resolve, ke folder job sendiri
+            opts = dict(
+                self.ydl_opts,
+                outtmpl=os.path.join(output_dir, '%(title).100B [%(id)s].%(ext)s'),
+                max_filesize=self.download_limit,
+                merge_output_format='mp4'
+            )
+            if plan['format']:
+                opts['format'] = plan['format']
+            if progress_hook:
+                opts['progress_hooks'] = [progress_hook]
+            with yt_dlp.YoutubeDL(opts) as ydl:
+                result = ydl.process_ie_result(copy.deepcopy(info), download=True)
+                filename = self._downloaded_path(ydl, result)
+            
+            if not filename or not os.path.exists(filename):
+                return None, "File video tidak ditemukan setelah download"
+            
+            return filename, "Success"
             
-            # Gunakan yt-dlp untuk semua platform
-            with yt_dlp.YoutubeDL(self.ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                
-                # Cek ukuran file
-                if info.get('filesize') and info['filesize'] > self.max_size:
-                    return None, "File terlalu besar (>50MB)"
-                
-                # Download video
-                ydl.download([url])
-                
-                # Cari file yang baru didownload
-                filename = f"{clean_filename(info['title'])}.mp4"
-                
-                return filename, "Success"
-                
         except Exception as e:
             logger.error(f"Download error: {str(e)}")
             return None, str(e)
     
-    def get_video_info(self, url):
-        """Get video info tanpa download"""
+    def download_video(self, url, platform=None, output_dir='.'):
+        """Download video dari berbagai platform"""
+        info = self.resolve(url)
+        if not info:
+            return None, "Tidak bisa mendapatkan info video"
+        
+        return self.download_info(info, platform or self.get_platform(url), output_dir)
+    
+    def expand_playlist(self, url, limit=10):
+        """URL video dari playlist / profil lewat flat extraction (tanpa resolve tiap video)"""
+        opts = dict(self.ydl_opts, extract_flat='in_playlist', playlistend=limit, noplaylist=False)
         try:
-            with yt_dlp.YoutubeDL(self.ydl_opts) as ydl:
+            with yt_dlp.YoutubeDL(opts) as ydl:
                 info = ydl.extract_info(url, download=False)
-                
-                return {
-                    'title': info.get('title', 'Unknown'),
-                    'duration': info.get('duration', 0),
-                    'thumbnail': info.get('thumbnail', ''),
-                    'platform': self.get_platform(url)
-                }
         except Exception as e:
-            logger.error(f"Info error: {str(e)}")
-            return None
\ No newline at end of file
+            logger.error(f"Playlist error: {str(e)}")
+            return []
+        
+        if info.get('_type') != 'playlist':
+            return [info.get('webpage_url') or url]
+        
+        entries = []
+        for entry in info.get('entries') or []:
+            entry_url = entry.get('url') or entry.get('webpage_url')
+            if entry_url and entry_url.startswith('http'):
+                entries.append(entry_url)
+            elif entry.get('ie_key') == 'Youtube' and entry.get('id'):
+                entries.append(f"https://www.youtube.com/watch?v={entry['id']}")
+        return entries[:limit]
+    
+    def lookup_info(self, url):
+        """Cek cache metadata tanpa akses network, return (found, video_info)"""
+        if self.meta_cache is None:
+            return False, None
+        
+        cached = self.meta_cache.get(url)
+        if cached is None:
+            return False, None
+        
+        ok, payload = cached
+        return True, payload if ok else None
+    
+    def get_video_info(self, url, check_cache=True):
+        """Get video info tanpa download"""
+        if check_cache:
+            found, video_info = self.lookup_info(url)
+            if found:
+                return video_info
+        
+        video_info, error = self.fetch_info(url)
+        if self.meta_cache is not None:
+            if video_info:
+                self.meta_cache.put(url, video_info)
+            else:
+                # Negative cache: link gagal tidak di-extract ulang untuk sementara
+                self.meta_cache.put_error(url, error)
+        return video_info
+    
+    def fetch_info(self, url):
+        """Extract dan ringkas info tanpa menyentuh cache, return (video_info, None) atau (None, error)"""
+        info, error = self._extract(url)
+        if not info:
+            return None, error
+        
+        video_info = self.summarize(info, url)
+        if video_info is None:
+            logger.info(f"Playlist link rejected: {url}")
+            return None, PLAYLIST_ERROR
+        return video_info, None
\ No newline at end of file
@@ -0,0 +1,148 @@
+import time
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from scheduler import FairScheduler, DurationStats
+
+logger = logging.getLogger(__name__)
+
+class ExecutorBusy(Exception):
+    """Dilempar saat kapasitas download (global / per user) sudah penuh"""
+
+    def __init__(self, message, user_id=None):
+        super().__init__(message)
+        self.user_id = user_id
+
+    @property
+    def per_user(self):
+        """True jika yang penuh adalah kuota user, bukan antrian global"""
+        return self.user_id is not None
+
+class DownloadExecutor:
+    """Worker pool untuk menjalankan pekerjaan yt-dlp di luar event loop.
+
+    Slot worker dibagi adil antar user lewat FairScheduler; user di
+    priority_users (admin / premium) memakai lane prioritas.
+    """
+
+    def __init__(self, max_workers=4, max_per_user=2, max_queue=50, mode='thread', priority_users=()):
+        self.max_workers = max(1, max_workers)
+        self.max_per_user = max(1, max_per_user)
+        self.max_queue = max(0, max_queue)
+        self.mode = mode
+        self.priority_users = set(priority_users)
+
+        if mode == 'process':
+            self.pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        else:
+            self.pool = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix='rei-download'
+            )
+
+        self.scheduler = FairScheduler(self.max_workers)
+        self.durations = DurationStats()
+        self._pending = 0
+        self._per_user = {}
+
+    @property
+    def pending(self):
+        """Jumlah job yang sedang berjalan + mengantri"""
+        return self._pending
+
+    def _admit(self, user_id, priority=False):
+        """Cek kapasitas sebelum job masuk antrian (lane prioritas tidak dibatasi antrian global)"""
+        if not priority and self._pending >= self.max_workers + self.max_queue:
+            raise ExecutorBusy("Download queue is full")
+        if user_id is not None and self._per_user.get(user_id, 0) >= self.max_per_user:
+            raise ExecutorBusy(f"User {user_id} reached {self.max_per_user} active jobs", user_id=user_id)
+
+        self._pending += 1
+        if user_id is not None:
+            self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+
+    def _release(self, user_id):
+        self._pending -= 1
+        if user_id is not None:
+            remaining = self._per_user.get(user_id, 1) - 1
+            if remaining > 0:
+                self._per_user[user_id] = remaining
+            else:
+                self._per_user.pop(user_id, None)
+
+    async def run(self, user_id, func, *args, **kwargs):
+        """Jalankan fungsi blocking di pool, dengan batas global dan per user"""
+        return await self.submit(user_id, None, func, *args, **kwargs)
+
+    async def submit(self, user_id, kind, func, *args, on_queued=None, **kwargs):
+        """Seperti run(), dengan jenis job (misal platform) untuk statistik durasi.
+
+        Durasi job per kind menjadi biaya antrian dan dasar estimasi ETA.
+        on_queued(posisi, eta_detik) di-await sekali jika job harus mengantri.
+        """
+        priority = user_id in self.priority_users
+        self._admit(user_id, priority)
+        ticket = self.scheduler.enqueue(user_id, self.durations.estimate(kind), priority=priority)
+        try:
+            if on_queued and not ticket.running:
+                await on_queued(*self.scheduler.position(ticket))
+            await self.scheduler.wait(ticket)
+
+            started = time.monotonic()
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                self.pool, functools.partial(func, *args, **kwargs)
+            )
+            if kind is not None:
+                self.durations.record(kind, time.monotonic() - started)
+            return result
+        finally:
+            self.scheduler.release(ticket)
+            self._release(user_id)
+
+    def shutdown(self, wait=False):
+        """Matikan pool worker"""
+        logger.info(f"Shutting down download executor ({self.mode})")
+        self.pool.shutdown(wait=wait, cancel_futures=True)
+
+class JobCoalescer:
+    """Gabungkan job identik (per key) yang sedang berjalan menjadi satu"""
+
+    def __init__(self):
+        self._jobs = {}
+        self.coalesced = 0
+
+    def is_running(self, key):
+        return key in self._jobs
+
+    async def run(self, key, factory):
+        """Jalankan factory() sekali per key, pemanggil lain menunggu hasil yang sama.
+
+        Return (result, shared): shared True jika hasil berasal dari job pemanggil lain.
+        """
+        future = self._jobs.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._jobs[key] = future
+        try:
+            result = await factory()
+        except asyncio.CancelledError:
+            # Pemanggil lain tidak ikut dibatalkan: mereka menerima error biasa
+            future.set_exception(RuntimeError("Proses video dibatalkan, silakan kirim ulang link"))
+            future.exception()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Tandai sudah dibaca agar tidak muncul warning jika tidak ada yang menunggu
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            self._jobs.pop(key, None)
@@ -0,0 +1,94 @@
+import bisect
+
+class Leaderboard:
+    """Index ranking user berdasarkan jumlah download.
+
+    User dikelompokkan per total download (bucket), dan jumlah user per
+    total disimpan di Fenwick tree sehingga rank dihitung dalam O(log n)
+    tanpa sorting seluruh user.
+    """
+
+    def __init__(self, size=1024):
+        self._size = size
+        self._tree = [0] * (size + 1)
+        self._buckets = {}
+        self._values = []
+        self._total = 0
+
+    def __len__(self):
+        return self._total
+
+    def _tree_add(self, downloads, delta):
+        index = downloads + 1
+        while index <= self._size:
+            self._tree[index] += delta
+            index += index & -index
+
+    def _prefix(self, downloads):
+        """Jumlah user dengan total download <= downloads"""
+        index = min(downloads + 1, self._size)
+        count = 0
+        while index > 0:
+            count += self._tree[index]
+            index -= index & -index
+        return count
+
+    def _grow(self, needed):
+        while self._size < needed:
+            self._size *= 2
+        self._tree = [0] * (self._size + 1)
+        for downloads, members in self._buckets.items():
+            index = downloads + 1
+            while index <= self._size:
+                self._tree[index] += len(members)
+                index += index & -index
+
+    def add(self, user_id, downloads=0):
+        """Tambahkan user baru ke index"""
+        if downloads + 1 > self._size:
+            self._grow(downloads + 1)
+
+        bucket = self._buckets.get(downloads)
+        if bucket is None:
+            bucket = self._buckets[downloads] = set()
+            bisect.insort(self._values, downloads)
+        bucket.add(user_id)
+        self._tree_add(downloads, 1)
+        self._total += 1
+
+    def remove(self, user_id, downloads):
+        """Hapus user dari index"""
+        bucket = self._buckets.get(downloads)
+        if not bucket or user_id not in bucket:
+            return
+        bucket.discard(user_id)
+        if not bucket:
+            del self._buckets[downloads]
+            del self._values[bisect.bisect_left(self._values, downloads)]
+        self._tree_add(downloads, -1)
+        self._total -= 1
+
+    def move(self, user_id, old, new):
+        """Pindahkan user saat total download berubah"""
+        self.remove(user_id, old)
+        self.add(user_id, new)
+
+    def rank(self, downloads):
+        """Rank (1 = terbanyak) untuk user dengan total download tertentu"""
+        return self._total - self._prefix(downloads) + 1
+
+    def percentile(self, downloads):
+        """Posisi dalam persen (semakin kecil semakin atas)"""
+        if not self._total:
+            return 0
+        return self.rank(downloads) / self._total * 100
+
+    def top(self, k):
+        """k user dengan download terbanyak, list (user_id, downloads)"""
+        result = []
+        for downloads in reversed(self._values):
+            for user_id in self._buckets[downloads]:
+                result.append((user_id, downloads))
+                if len(result) >= k:
+                    return result
+        return result
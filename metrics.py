@@ -0,0 +1,187 @@
+import math
+import time
+import asyncio
+import logging
+import contextlib
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Batas bucket histogram (detik), dari parse URL sampai upload video besar
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Kelas error dari pesan error yt-dlp / bot (pencocokan huruf kecil, urutan menentukan)
+ERROR_CLASSES = (
+    ('rate_limited', ('terlalu banyak permintaan', 'too many requests', '429')),
+    ('too_large', ('terlalu besar', 'melebihi', 'too large', 'filesize')),
+    ('unavailable', ('unavailable', 'private', 'not available', 'removed', 'tidak tersedia')),
+    ('login_required', ('login', 'sign in', 'cookies')),
+    ('no_info', ('tidak bisa mendapatkan info',)),
+    ('network', ('timed out', 'timeout', 'connection', 'network', '403')),
+)
+
+def error_class(error):
+    """Kelas error untuk label metrik: nama exception, atau kategori dari pesan error"""
+    if error is None:
+        return 'none'
+    if isinstance(error, BaseException):
+        return type(error).__name__
+    message = str(error).lower()
+    for name, keywords in ERROR_CLASSES:
+        if any(keyword in message for keyword in keywords):
+            return name
+    return 'other'
+
+def _labels(**labels):
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels.items()) + '}'
+
+class Histogram:
+    """Histogram kumulatif untuk Prometheus + sampel terakhir untuk persentil"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count', 'recent')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window=1000):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        self.recent.append(value)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+def percentile(samples, q):
+    """Persentil nearest-rank dari list sampel yang sudah diurutkan"""
+    if not samples:
+        return 0.0
+    index = max(0, math.ceil(q / 100 * len(samples)) - 1)
+    return samples[index]
+
+class Metrics:
+    """Metrik per tahap pemrosesan link: histogram latency per platform, counter hasil, gauge.
+
+    Diekspos dalam format teks Prometheus lewat HTTP lokal (start_server) dan
+    diringkas ke p50/p95/p99 untuk command /perf.
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.started = time.time()
+        self._histograms = {}
+        self._results = {}
+        self._gauges = {}
+
+    def observe(self, stage, seconds, platform='unknown'):
+        histogram = self._histograms.get((stage, platform))
+        if histogram is None:
+            histogram = self._histograms[(stage, platform)] = Histogram(window=self.window)
+        histogram.observe(seconds)
+
+    @contextlib.contextmanager
+    def timer(self, stage, platform='unknown'):
+        """Ukur durasi blok (boleh berisi await), tercatat juga jika blok error"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, platform)
+
+    def count(self, platform, error=None):
+        """Catat hasil satu link: sukses jika error None, selain itu per kelas error"""
+        key = (platform, 'success' if error is None else 'failure', error_class(error))
+        self._results[key] = self._results.get(key, 0) + 1
+
+    def gauge(self, name, description, func):
+        """Daftarkan gauge yang nilainya dibaca saat scrape"""
+        self._gauges[name] = (description, func)
+
+    def stage_summary(self):
+        """{stage: (jumlah, p50, p95, p99)} gabungan semua platform, dari sampel terakhir"""
+        samples = {}
+        totals = {}
+        for (stage, _), histogram in self._histograms.items():
+            samples.setdefault(stage, []).extend(histogram.recent)
+            totals[stage] = totals.get(stage, 0) + histogram.count
+        summary = {}
+        for stage, values in samples.items():
+            values.sort()
+            summary[stage] = (totals[stage], *(percentile(values, q) for q in (50, 95, 99)))
+        return summary
+
+    def platform_summary(self, stage):
+        """{platform: (jumlah, p50, p95, p99)} untuk satu tahap"""
+        summary = {}
+        for (name, platform), histogram in self._histograms.items():
+            if name == stage:
+                values = sorted(histogram.recent)
+                summary[platform] = (histogram.count, *(percentile(values, q) for q in (50, 95, 99)))
+        return summary
+
+    def results(self):
+        return dict(self._results)
+
+    def render(self):
+        """Semua metrik dalam format teks Prometheus"""
+        lines = [
+            "# HELP rei_stage_seconds Latency per tahap pemrosesan link",
+            "# TYPE rei_stage_seconds histogram",
+        ]
+        for (stage, platform), histogram in sorted(self._histograms.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f"rei_stage_seconds_bucket{_labels(stage=stage, platform=platform, le=bound)} {cumulative}")
+            lines.append(f"rei_stage_seconds_bucket{_labels(stage=stage, platform=platform, le='+Inf')} {histogram.count}")
+            lines.append(f"rei_stage_seconds_sum{_labels(stage=stage, platform=platform)} {histogram.sum:.6f}")
+            lines.append(f"rei_stage_seconds_count{_labels(stage=stage, platform=platform)} {histogram.count}")
+
+        lines += [
+            "# HELP rei_links_total Link yang selesai diproses per hasil dan kelas error",
+            "# TYPE rei_links_total counter",
+        ]
+        for (platform, result, error), count in sorted(self._results.items()):
+            lines.append(f"rei_links_total{_labels(platform=platform, result=result, error=error)} {count}")
+
+        for name, (description, func) in self._gauges.items():
+            try:
+                value = func()
+            except Exception as e:
+                logger.warning(f"Failed to read gauge {name}: {e}")
+                continue
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+    async def _handle(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readline(), 10)
+            # Header request tidak dipakai, cukup dibaca sampai baris kosong
+            while (await asyncio.wait_for(reader.readline(), 10)).strip():
+                pass
+            parts = request.decode('latin-1').split()
+            if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] == '/metrics':
+                status, body = '200 OK', self.render().encode()
+            else:
+                status, body = '404 Not Found', b'Not Found\n'
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                f"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except Exception as e:
+            logger.debug(f"Metrics request failed: {e}")
+        finally:
+            writer.close()
+
+    async def start_server(self, host='127.0.0.1', port=9464):
+        """Endpoint GET /metrics untuk Prometheus, return server asyncio"""
+        server = await asyncio.start_server(self._handle, host, port)
+        logger.info(f"Metrics endpoint listening on http://{host}:{port}/metrics")
+        return server
@@ -0,0 +1,152 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+
+from telegram.helpers import escape_markdown
+
+logger = logging.getLogger(__name__)
+
+class AdminNotifier:
+    """Antrian notifikasi admin: event digabung jadi digest berkala, error kritis dikirim langsung"""
+
+    def __init__(self, admin_id, digest_interval=300, dedup_window=60, max_errors=5, metrics=None):
+        self.admin_id = admin_id
+        self.metrics = metrics
+        self.digest_interval = digest_interval
+        self.dedup_window = dedup_window
+
+        self.bot = None
+        self._outbox = asyncio.Queue()
+        self._tasks = []
+
+        self._counts = {}
+        self._platforms = {}
+        self._new_users = deque(maxlen=5)
+        self._errors = deque(maxlen=max_errors)
+        self._recent_critical = {}
+        self._suppressed = 0
+        self._since = time.time()
+
+    def record(self, event, platform=None, username=None):
+        """Catat event untuk digest (tidak mengirim apa pun)"""
+        self._counts[event] = self._counts.get(event, 0) + 1
+        if platform:
+            per_platform = self._platforms.setdefault(platform, {})
+            per_platform[event] = per_platform.get(event, 0) + 1
+        if event == 'new_user' and username:
+            self._new_users.append(username)
+
+    def record_error(self, platform, error, username=None):
+        """Catat download gagal, ditampilkan di digest berikutnya"""
+        self.record('failure', platform)
+        # Backtick di pesan error merusak format Markdown digest
+        error = str(error)[:100].replace('`', "'")
+        self._errors.append(
+            f"{datetime.now().strftime('%H:%M')} {platform} @{username or 'no_username'}: {error}"
+        )
+
+    def send(self, text):
+        """Kirim pesan ke admin secepatnya (tanpa menunggu)"""
+        self._outbox.put_nowait(text)
+
+    def critical(self, text, key=None):
+        """Error kritis: dikirim langsung, error identik dalam satu window hanya dikirim sekali"""
+        key = key or text
+        now = time.time()
+        last = self._recent_critical.get(key)
+        if last and now - last < self.dedup_window:
+            self._suppressed += 1
+            return False
+
+        self._recent_critical[key] = now
+        # Buang entry dedup yang sudah lewat window
+        if len(self._recent_critical) > 256:
+            self._recent_critical = {
+                k: t for k, t in self._recent_critical.items() if now - t < self.dedup_window
+            }
+        self.send(text)
+        return True
+
+    def build_digest(self):
+        """Susun teks digest dari event sejak digest terakhir, None jika tidak ada event"""
+        if not self._counts and not self._suppressed:
+            return None
+
+        started = datetime.fromtimestamp(self._since).strftime('%H:%M')
+        lines = [
+            f"📋 *REI ASSISTANT DIGEST* ({started} - {datetime.now().strftime('%H:%M')})",
+            "",
+            f"🚀 New Users: {self._counts.get('new_user', 0)}",
+            f"📥 Attempts: {self._counts.get('attempt', 0)}",
+            f"✅ Success: {self._counts.get('success', 0)} (cache: {self._counts.get('cache_hit', 0)})",
+            f"❌ Failed: {self._counts.get('failure', 0)}",
+        ]
+
+        if self._new_users:
+            # Username boleh berisi "_" yang merusak Markdown digest
+            lines.append("👤 " + ", ".join(f"@{escape_markdown(name)}" for name in self._new_users))
+
+        if self._platforms:
+            lines += ["", "🌐 *Per Platform:*"]
+            for platform, counts in sorted(self._platforms.items()):
+                lines.append(
+                    f"• {platform.title()}: {counts.get('success', 0) + counts.get('cache_hit', 0)} ok, "
+                    f"{counts.get('failure', 0)} failed"
+                )
+
+        if self._errors:
+            lines += ["", "⚠️ *Latest Errors:*"]
+            lines += [f"• `{error}`" for error in self._errors]
+
+        if self._suppressed:
+            lines += ["", f"🔕 {self._suppressed} duplicate critical errors suppressed"]
+
+        self._counts = {}
+        self._platforms = {}
+        self._new_users.clear()
+        self._errors.clear()
+        self._suppressed = 0
+        self._since = time.time()
+        return "\n".join(lines)
+
+    async def _deliver(self, text):
+        started = time.perf_counter()
+        try:
+            await self.bot.send_message(chat_id=self.admin_id, text=text, parse_mode='Markdown')
+            if self.metrics:
+                self.metrics.observe('notify', time.perf_counter() - started, 'telegram')
+            logger.info(f"Notification sent to admin: {text[:50]}...")
+        except Exception as e:
+            logger.error(f"Failed to notify admin: {e}")
+
+    async def _sender(self):
+        while True:
+            text = await self._outbox.get()
+            await self._deliver(text)
+
+    async def _digest_loop(self):
+        while True:
+            await asyncio.sleep(self.digest_interval)
+            digest = self.build_digest()
+            if digest:
+                self.send(digest)
+
+    def start(self, bot):
+        """Mulai background task (panggil dari dalam event loop)"""
+        self.bot = bot
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._sender()), loop.create_task(self._digest_loop())]
+
+    async def stop(self):
+        """Kirim digest terakhir dan sisa antrian, lalu hentikan task"""
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+        digest = self.build_digest()
+        if digest:
+            self.send(digest)
+        while self.bot and not self._outbox.empty():
+            await self._deliver(self._outbox.get_nowait())
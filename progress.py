@@ -0,0 +1,136 @@
+import time
+import asyncio
+import logging
+import contextlib
+
+from utils import format_file_size
+
+logger = logging.getLogger(__name__)
+
+def _bar(percent):
+    filled = int(min(max(percent, 0), 100) // 10)
+    return '▓' * filled + '░' * (10 - filled)
+
+def download_text(status):
+    """Teks progress dari dict progress_hooks yt-dlp"""
+    done = status.get('downloaded_bytes') or 0
+    total = status.get('total_bytes') or status.get('total_bytes_estimate')
+    speed = status.get('speed')
+    eta = status.get('eta')
+
+    lines = ["⬇️ *Mendownload video...*"]
+    if total:
+        percent = done / total * 100
+        lines.append(f"{_bar(percent)} {min(percent, 100):.0f}%")
+        lines.append(f"📦 {format_file_size(done)} / {format_file_size(total)}")
+    else:
+        lines.append(f"📦 {format_file_size(done)}")
+
+    details = []
+    if speed:
+        details.append(f"⚡ {format_file_size(speed)}/s")
+    if eta is not None:
+        details.append(f"⏱️ ETA {int(eta)}s")
+    if details:
+        lines.append(" • ".join(details))
+    return "\n".join(lines)
+
+def upload_text(size, elapsed, rate=None):
+    """Teks progress upload, persentase diperkirakan dari kecepatan upload sebelumnya"""
+    lines = ["📤 *Mengupload ke Telegram...*", f"📁 {format_file_size(size)}"]
+    if rate:
+        percent = min(elapsed * rate / max(size, 1) * 100, 99)
+        lines.append(f"{_bar(percent)} ~{percent:.0f}%")
+    lines.append(f"⏱️ {int(elapsed)}s")
+    return "\n".join(lines)
+
+class UploadMeter:
+    """Rata-rata (EWMA) kecepatan upload ke Telegram dalam byte/detik"""
+
+    def __init__(self, alpha=0.3):
+        self.alpha = alpha
+        self.rate = None
+
+    def record(self, size, seconds):
+        if seconds <= 0 or size <= 0:
+            return
+        rate = size / seconds
+        self.rate = rate if self.rate is None else self.alpha * rate + (1 - self.alpha) * self.rate
+
+class ProgressReporter:
+    """Progress download / upload di satu pesan status.
+
+    Hook yt-dlp berjalan di thread worker; teks dikirim ke event loop lewat
+    call_soon_threadsafe dan pesan hanya di-edit maksimal sekali per `interval`
+    detik (limit edit Telegram). Update di antaranya dibuang.
+    """
+
+    def __init__(self, message, interval=3.0, loop=None):
+        self.message = message
+        self.interval = interval
+        self.loop = loop or asyncio.get_running_loop()
+        # Pesan baru saja di-edit oleh bot, progress pertama menunggu satu interval
+        self._last_edit = time.monotonic()
+        self._last_hook = 0.0
+        self._last_text = None
+        self._editing = None
+
+    def hook(self, status):
+        """progress_hooks yt-dlp (dipanggil dari thread worker)"""
+        if status.get('status') != 'downloading':
+            return
+        # Throttle di sisi thread agar event loop tidak dibanjiri callback
+        now = time.monotonic()
+        if now - self._last_hook < self.interval:
+            return
+        self._last_hook = now
+        self.loop.call_soon_threadsafe(self.show, download_text(status))
+
+    def show(self, text):
+        """Tampilkan teks jika sudah lewat interval dan tidak ada edit yang sedang berjalan"""
+        now = time.monotonic()
+        if self._editing is not None or text == self._last_text or now - self._last_edit < self.interval:
+            return
+        self._last_edit = now
+        self._last_text = text
+        self._editing = self.loop.create_task(self._edit(text))
+
+    async def _edit(self, text):
+        try:
+            await self.message.edit_text(text, parse_mode='Markdown')
+        except Exception as e:
+            logger.debug(f"Progress update skipped: {e}")
+        finally:
+            self._editing = None
+
+    async def settle(self):
+        """Tunggu edit progress yang sedang berjalan, sebelum bot meng-edit pesan yang sama"""
+        if self._editing is not None:
+            with contextlib.suppress(Exception):
+                await self._editing
+
+    @contextlib.asynccontextmanager
+    async def uploading(self, size, meter=None):
+        """Status upload berkala selama reply_video berjalan.
+
+        PTB membaca seluruh file sebelum request dikirim, jadi byte yang
+        terkirim tidak bisa diukur; progress diperkirakan dari UploadMeter.
+        """
+        started = time.monotonic()
+
+        async def tick():
+            # Pesan "Mengupload..." baru saja dikirim bot, update pertama setelah satu interval
+            while True:
+                await asyncio.sleep(self.interval)
+                self.show(upload_text(size, time.monotonic() - started, meter.rate if meter else None))
+
+        ticker = self.loop.create_task(tick())
+        try:
+            yield
+            if meter:
+                meter.record(size, time.monotonic() - started)
+        finally:
+            ticker.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await ticker
+            await self.settle()
@@ -0,0 +1,130 @@
+import time
+import asyncio
+import logging
+
+from cache import open_database
+
+logger = logging.getLogger(__name__)
+
+def parse_limits(value):
+    """Parse "instagram:20,tiktok:60" menjadi {platform: per_menit}"""
+    limits = {}
+    for item in value.split(','):
+        name, _, per_minute = item.partition(':')
+        if name.strip() and per_minute.strip():
+            limits[name.strip().lower()] = float(per_minute)
+    return limits
+
+class RateLimiter:
+    """Token bucket per scope ("user", "platform") dan key, dicek sebelum pekerjaan jaringan.
+
+    check() tidak pernah menunggu: return 0 jika diizinkan, atau detik sampai
+    token cukup. Bucket disimpan di memori; jika path diisi, sisa token
+    di-flush berkala ke SQLite agar restart tidak mereset limit.
+    """
+
+    def __init__(self, path=None, flush_interval=30):
+        self.flush_interval = flush_interval
+        self._limits = {}
+        self._buckets = {}
+        self.rejected = {}
+        self._flusher = None
+        self._stopping = None
+
+        self.conn = None
+        if path:
+            self.conn = open_database(path)
+            # Kolom key tanpa tipe: id user (int) dan nama platform (str) tersimpan apa adanya
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_buckets (
+                    scope TEXT NOT NULL,
+                    key NOT NULL,
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    PRIMARY KEY (scope, key)
+                )
+            """)
+            for scope, key, tokens, updated in self.conn.execute(
+                    'SELECT scope, key, tokens, updated FROM rate_buckets'):
+                self._buckets[(scope, key)] = [tokens, updated]
+            logger.info(f"Rate limiter loaded: {len(self._buckets)} buckets from {path}")
+
+    def configure(self, scope, per_minute, burst=None, key=None):
+        """Set limit untuk scope (semua key) atau satu key tertentu; per_minute <= 0 = tanpa limit"""
+        if per_minute <= 0:
+            self._limits.pop((scope, key), None)
+            return
+        self._limits[(scope, key)] = (per_minute / 60, float(burst or per_minute))
+
+    def _limit(self, scope, key):
+        return self._limits.get((scope, key)) or self._limits.get((scope, None))
+
+    def _tokens(self, bucket, rate, capacity, now):
+        if bucket is None:
+            return capacity
+        return min(capacity, bucket[0] + (now - bucket[1]) * rate)
+
+    def check(self, scope, key, cost=1):
+        """Ambil token, return 0.0 jika diizinkan atau perkiraan detik sampai boleh mencoba lagi"""
+        limit = self._limit(scope, key)
+        if limit is None:
+            return 0.0
+
+        rate, capacity = limit
+        now = time.time()
+        tokens = self._tokens(self._buckets.get((scope, key)), rate, capacity, now)
+        if tokens >= cost:
+            self._buckets[(scope, key)] = [tokens - cost, now]
+            return 0.0
+
+        self.rejected[scope] = self.rejected.get(scope, 0) + 1
+        return (cost - tokens) / rate
+
+    def _snapshot(self):
+        """Buang bucket yang sudah penuh lagi (sama dengan belum pernah dipakai), return sisanya"""
+        now = time.time()
+        rows = []
+        for (scope, key), bucket in list(self._buckets.items()):
+            limit = self._limit(scope, key)
+            if limit is None or self._tokens(bucket, *limit, now) >= limit[1]:
+                del self._buckets[(scope, key)]
+            else:
+                rows.append((scope, key, bucket[0], bucket[1]))
+        return rows
+
+    def _write(self, rows):
+        with self.conn:
+            self.conn.execute('BEGIN')
+            self.conn.execute('DELETE FROM rate_buckets')
+            self.conn.executemany(
+                'INSERT INTO rate_buckets (scope, key, tokens, updated) VALUES (?, ?, ?, ?)', rows
+            )
+
+    async def _flush_loop(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            rows = self._snapshot()
+            if self.conn:
+                try:
+                    await asyncio.to_thread(self._write, rows)
+                except Exception as e:
+                    logger.error(f"Failed to save rate limit buckets: {e}")
+
+    def start(self):
+        """Mulai pembersihan / flush berkala (panggil dari dalam event loop)"""
+        if self._flusher is None:
+            self._stopping = asyncio.Event()
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def stop(self):
+        """Hentikan flush berkala, simpan bucket terakhir lalu tutup database"""
+        if self._flusher is not None:
+            self._stopping.set()
+            await self._flusher
+            self._flusher = None
+        if self.conn:
+            self._write(self._snapshot())
+            self.conn.close()
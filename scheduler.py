@@ -0,0 +1,132 @@
+import time
+import heapq
+import asyncio
+import itertools
+
+class DurationStats:
+    """Rata-rata (EWMA) durasi job per jenis / platform, untuk biaya antrian dan estimasi ETA"""
+
+    def __init__(self, default=30.0, alpha=0.2):
+        self.default = default
+        self.alpha = alpha
+        self._avg = {}
+
+    def record(self, key, seconds):
+        avg = self._avg.get(key)
+        self._avg[key] = seconds if avg is None else self.alpha * seconds + (1 - self.alpha) * avg
+
+    def estimate(self, key):
+        return self._avg.get(key, self.default)
+
+    def snapshot(self):
+        return dict(self._avg)
+
+class Ticket:
+    """Satu job di scheduler"""
+
+    __slots__ = ('user_id', 'cost', 'lane', 'finish', 'start', 'seq', 'future', 'started_at')
+
+    def __init__(self, user_id, cost, lane, start, finish, seq, future):
+        self.user_id = user_id
+        self.cost = cost
+        self.lane = lane
+        self.start = start
+        self.finish = finish
+        self.seq = seq
+        self.future = future
+        self.started_at = None
+
+    @property
+    def order(self):
+        return (self.lane, self.finish, self.seq)
+
+    @property
+    def running(self):
+        return self.started_at is not None
+
+class FairScheduler:
+    """Weighted fair queuing untuk slot worker.
+
+    Setiap job diberi tag finish virtual = max(waktu virtual, tag job terakhir
+    user yang sama) + biaya / bobot, lalu slot diberikan ke tag terkecil. User
+    yang mengirim banyak link hanya mengantri di belakang job miliknya sendiri,
+    job user lain tetap mendapat giliran. Lane prioritas (admin / premium)
+    selalu dilayani sebelum lane biasa.
+    """
+
+    PRIORITY, NORMAL = 0, 1
+
+    def __init__(self, slots):
+        self.slots = max(1, slots)
+        self._queue = []
+        self._running = set()
+        self._virtual = 0.0
+        self._finish = {}
+        self._active = {}
+        self._seq = itertools.count()
+
+    @property
+    def running(self):
+        return len(self._running)
+
+    @property
+    def waiting(self):
+        return sum(1 for entry in self._queue if not entry[-1].future.done())
+
+    def enqueue(self, user_id, cost=1.0, weight=1.0, priority=False):
+        """Daftarkan job, slot langsung diberikan jika ada yang kosong"""
+        start = max(self._virtual, self._finish.get(user_id, 0.0))
+        ticket = Ticket(
+            user_id, cost, self.PRIORITY if priority else self.NORMAL,
+            start, start + cost / weight, next(self._seq),
+            asyncio.get_running_loop().create_future()
+        )
+        self._finish[user_id] = ticket.finish
+        self._active[user_id] = self._active.get(user_id, 0) + 1
+        heapq.heappush(self._queue, (*ticket.order, ticket))
+        self._dispatch()
+        return ticket
+
+    def _dispatch(self):
+        while self._queue and len(self._running) < self.slots:
+            ticket = heapq.heappop(self._queue)[-1]
+            if ticket.future.done():
+                # Dibatalkan saat mengantri
+                continue
+            self._virtual = max(self._virtual, ticket.start)
+            ticket.started_at = time.monotonic()
+            self._running.add(ticket)
+            ticket.future.set_result(None)
+
+    async def wait(self, ticket):
+        """Tunggu giliran job"""
+        await ticket.future
+
+    def release(self, ticket):
+        """Job selesai atau dibatalkan (mengantri maupun berjalan), wajib dipanggil sekali"""
+        if ticket in self._running:
+            self._running.discard(ticket)
+        elif not ticket.future.done():
+            ticket.future.cancel()
+
+        remaining = self._active.get(ticket.user_id, 1) - 1
+        if remaining > 0:
+            self._active[ticket.user_id] = remaining
+        else:
+            # User tanpa job aktif tidak menyimpan "hutang" virtual
+            self._active.pop(ticket.user_id, None)
+            self._finish.pop(ticket.user_id, None)
+        self._dispatch()
+
+    def position(self, ticket):
+        """Return (posisi antrian mulai 1, estimasi detik sampai job mulai); (0, 0) jika sudah jalan"""
+        if ticket.running:
+            return 0, 0.0
+
+        ahead = [entry[-1] for entry in self._queue
+                 if entry[:3] < ticket.order and not entry[-1].future.done()]
+        now = time.monotonic()
+        # Sisa pekerjaan di depan dibagi rata ke semua slot
+        work = sum(max(job.cost - (now - job.started_at), 0) for job in self._running)
+        work += sum(job.cost for job in ahead)
+        return len(ahead) + 1, work / self.slots
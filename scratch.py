@@ -0,0 +1,85 @@
+import os
+import shutil
+import asyncio
+import logging
+import tempfile
+import contextlib
+
+from executor import ExecutorBusy
+
+logger = logging.getLogger(__name__)
+
+class ScratchFull(ExecutorBusy):
+    """Dilempar saat disk scratch tetap penuh setelah menunggu"""
+
+class ScratchSpace:
+    """Folder kerja terisolasi per job download, dengan budget pemakaian disk"""
+
+    JOB_PREFIX = 'job_'
+
+    def __init__(self, root, max_bytes=0, min_free_bytes=0, wait_timeout=60, poll_interval=2):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.min_free_bytes = min_free_bytes
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._active = set()
+
+        os.makedirs(self.root, exist_ok=True)
+        self.purge()
+
+    def purge(self):
+        """Hapus sisa folder job dari proses sebelumnya (crash / restart)"""
+        for entry in os.scandir(self.root):
+            if entry.is_dir() and entry.name.startswith(self.JOB_PREFIX) and entry.path not in self._active:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                logger.info(f"Removed stale scratch dir {entry.path}")
+
+    def usage_bytes(self):
+        """Total ukuran file di folder job yang sedang aktif"""
+        total = 0
+        for path in list(self._active):
+            for folder, _, files in os.walk(path):
+                for name in files:
+                    try:
+                        total += os.path.getsize(os.path.join(folder, name))
+                    except OSError:
+                        pass
+        return total
+
+    def has_space(self):
+        """Cek budget scratch dan sisa ruang di volume"""
+        if self.min_free_bytes and shutil.disk_usage(self.root).free < self.min_free_bytes:
+            return False
+        if self.max_bytes and self.usage_bytes() >= self.max_bytes:
+            return False
+        return True
+
+    async def acquire(self):
+        """Buat folder job baru, tunggu dulu jika disk sedang penuh"""
+        waited = 0
+        while not self.has_space():
+            if waited == 0:
+                logger.warning("Scratch disk budget reached, pausing new downloads")
+            if waited >= self.wait_timeout:
+                raise ScratchFull("Scratch disk is full")
+            await asyncio.sleep(self.poll_interval)
+            waited += self.poll_interval
+
+        path = tempfile.mkdtemp(prefix=self.JOB_PREFIX, dir=self.root)
+        self._active.add(path)
+        return path
+
+    def release(self, path):
+        """Hapus folder job beserta isinya"""
+        self._active.discard(path)
+        shutil.rmtree(path, ignore_errors=True)
+
+    @contextlib.asynccontextmanager
+    async def job(self):
+        """Folder kerja yang pasti dihapus saat sukses, error maupun cancel"""
+        path = await self.acquire()
+        try:
+            yield path
+        finally:
+            self.release(path)
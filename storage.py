@@ -0,0 +1,216 @@
+import time
+import asyncio
+import logging
+
+from cache import open_database
+from leaderboard import Leaderboard
+from counters import StatsCounters
+
+logger = logging.getLogger(__name__)
+
+class UserRecord:
+    """Statistik satu user (slotted agar hemat memori)"""
+
+    __slots__ = ('user_id', 'username', 'full_name', 'downloads', 'first_seen', 'last_seen')
+
+    def __init__(self, user_id, username=None, full_name=None, downloads=0, first_seen=None, last_seen=None):
+        now = time.time()
+        self.user_id = user_id
+        self.username = username
+        self.full_name = full_name
+        self.downloads = downloads
+        self.first_seen = first_seen or now
+        self.last_seen = last_seen or now
+
+    def as_row(self):
+        return (self.user_id, self.username, self.full_name,
+                self.downloads, self.first_seen, self.last_seen)
+
+class UserStore:
+    """Statistik user di memori untuk hot path, di-flush batch ke SQLite secara berkala"""
+
+    def __init__(self, path, flush_interval=5):
+        self.flush_interval = flush_interval
+        self._users = {}
+        self.leaderboard = Leaderboard()
+        self.counters = StatsCounters()
+        self._dirty = set()
+        self._removed = set()
+        self._flusher = None
+        self._stopping = None
+
+        self.conn = open_database(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                user_id INTEGER PRIMARY KEY,
+                username TEXT,
+                full_name TEXT,
+                downloads INTEGER NOT NULL DEFAULT 0,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS daily_stats (
+                day TEXT PRIMARY KEY,
+                active INTEGER NOT NULL,
+                new INTEGER NOT NULL,
+                downloads INTEGER NOT NULL,
+                failures INTEGER NOT NULL,
+                platforms TEXT NOT NULL,
+                failed_platforms TEXT NOT NULL
+            )
+        """)
+        for row in self.conn.execute(
+                'SELECT user_id, username, full_name, downloads, first_seen, last_seen FROM users'):
+            self._users[row[0]] = UserRecord(*row)
+            self.leaderboard.add(row[0], row[3])
+            self.counters.total_downloads += row[3]
+        self.counters.total_users = len(self._users)
+        self.counters.load(self.conn.execute(
+            'SELECT day, active, new, downloads, failures, platforms, failed_platforms '
+            'FROM daily_stats WHERE day >= ?', (self.counters.cutoff(),)
+        ).fetchall())
+        logger.info(f"User store loaded: {len(self._users)} users from {path}")
+
+    def __len__(self):
+        return len(self._users)
+
+    def __contains__(self, user_id):
+        return user_id in self._users
+
+    def get(self, user_id):
+        """Record user, None jika belum pernah terlihat"""
+        return self._users.get(user_id)
+
+    def records(self):
+        return self._users.values()
+
+    def user_ids(self):
+        return list(self._users)
+
+    def rank(self, user_id):
+        """Return (rank, total_users, percentile), None jika user belum ada"""
+        record = self._users.get(user_id)
+        if record is None:
+            return None
+        return (self.leaderboard.rank(record.downloads), len(self.leaderboard),
+                self.leaderboard.percentile(record.downloads))
+
+    def top(self, k):
+        """k record user dengan download terbanyak"""
+        return [self._users[user_id] for user_id, _ in self.leaderboard.top(k)]
+
+    def touch(self, user_id, username=None, full_name=None):
+        """Catat aktivitas user (buat record baru jika belum ada), return (record, is_new)"""
+        record = self._users.get(user_id)
+        is_new = record is None
+        if is_new:
+            record = UserRecord(user_id, username, full_name)
+            self._users[user_id] = record
+            self.leaderboard.add(user_id, 0)
+            self.counters.user_seen(True, record.last_seen)
+        else:
+            self.counters.user_seen(False, record.last_seen)
+            record.last_seen = time.time()
+            record.username = username
+            record.full_name = full_name
+
+        self._dirty.add(user_id)
+        return record, is_new
+
+    def add_download(self, user_id, platform='unknown'):
+        """Tambah hitungan download user, return total barunya"""
+        record = self._users.get(user_id)
+        if record is None:
+            record, _ = self.touch(user_id)
+        record.downloads += 1
+        self.leaderboard.move(user_id, record.downloads - 1, record.downloads)
+        self.counters.download(platform)
+        self._dirty.add(user_id)
+        return record.downloads
+
+    def record_failure(self, platform='unknown'):
+        """Catat download yang gagal"""
+        self.counters.failure(platform)
+
+    def remove(self, user_id):
+        """Hapus user (misal sudah block bot)"""
+        record = self._users.pop(user_id, None)
+        if record is not None:
+            self.leaderboard.remove(user_id, record.downloads)
+            self.counters.user_removed(record.downloads)
+            self._dirty.discard(user_id)
+            self._removed.add(user_id)
+
+    def _pending(self):
+        rows = [self._users[uid].as_row() for uid in self._dirty if uid in self._users]
+        removed = [(uid,) for uid in self._removed]
+        days = self.counters.pending_rows()
+        self._dirty.clear()
+        self._removed.clear()
+        return rows, removed, days
+
+    def _write(self, rows, removed, days):
+        with self.conn:
+            self.conn.execute('BEGIN')
+            self.conn.executemany('DELETE FROM users WHERE user_id = ?', removed)
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO daily_stats '
+                '(day, active, new, downloads, failures, platforms, failed_platforms) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                days
+            )
+            self.conn.executemany(
+                'INSERT INTO users (user_id, username, full_name, downloads, first_seen, last_seen) '
+                'VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(user_id) DO UPDATE SET username = excluded.username, '
+                'full_name = excluded.full_name, downloads = excluded.downloads, '
+                'last_seen = excluded.last_seen',
+                rows
+            )
+
+    def flush(self):
+        """Tulis semua perubahan ke disk (blocking)"""
+        rows, removed, days = self._pending()
+        if rows or removed or days:
+            self._write(rows, removed, days)
+        return len(rows)
+
+    async def flush_async(self):
+        """Tulis perubahan ke disk di thread terpisah agar event loop tidak menunggu"""
+        rows, removed, days = self._pending()
+        if not rows and not removed and not days:
+            return 0
+        try:
+            await asyncio.to_thread(self._write, rows, removed, days)
+        except Exception as e:
+            logger.error(f"Failed to flush {len(rows)} user records: {e}")
+            self._dirty.update(row[0] for row in rows)
+            self._removed.update(uid for (uid,) in removed)
+            self.counters.mark_dirty(days)
+            return 0
+        return len(rows)
+
+    async def _flush_loop(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush_async()
+
+    def start(self):
+        """Mulai flush berkala (panggil dari dalam event loop)"""
+        if self._flusher is None:
+            self._stopping = asyncio.Event()
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def stop(self):
+        """Hentikan flush berkala, tulis sisa perubahan lalu tutup database"""
+        if self._flusher is not None:
+            self._stopping.set()
+            await self._flusher
+            self._flusher = None
+        self.flush()
+        self.conn.close()
@@ -0,0 +1,48 @@
+import os
+import sys
+import asyncio
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from executor import JobCoalescer
+
+def test_waiter_gets_error_when_owner_cancelled():
+    async def scenario():
+        inflight = JobCoalescer()
+        started = asyncio.Event()
+
+        async def job():
+            started.set()
+            await asyncio.sleep(60)
+            return 'done'
+
+        owner = asyncio.create_task(inflight.run('video', job))
+        await started.wait()
+        waiter = asyncio.create_task(inflight.run('video', job))
+        await asyncio.sleep(0)
+
+        owner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+        # Waiter tidak ikut dibatalkan, tapi menerima error biasa (jalur balasan error)
+        with pytest.raises(RuntimeError):
+            await waiter
+        assert inflight.coalesced == 1
+        assert not inflight.is_running('video')
+
+    asyncio.run(scenario())
+
+def test_waiter_shares_owner_result():
+    async def scenario():
+        inflight = JobCoalescer()
+
+        async def job():
+            await asyncio.sleep(0.01)
+            return 'done'
+
+        results = await asyncio.gather(inflight.run('video', job), inflight.run('video', job))
+        assert results == [('done', False), ('done', True)]
+
+    asyncio.run(scenario())
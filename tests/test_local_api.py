@@ -0,0 +1,105 @@
+"""Test mode Bot API lokal (telegram-bot-api) terhadap benchmarks/fakes.FakeBotAPI.
+
+Jalankan dari root repo:
+    python -m pytest -q tests
+"""
+import os
+import sys
+import asyncio
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from telegram.ext import Application
+
+from fakes import FakeBotAPI
+from bot import ReiAssistantBot, Config
+
+TOKEN = "123456:test"
+
+@pytest.fixture
+def config(monkeypatch, tmp_path):
+    """Config dengan semua state di tmp_path (dikembalikan monkeypatch setelah test)"""
+    for name, value in {
+        'BOT_TOKEN': TOKEN,
+        'SCRATCH_DIR': str(tmp_path / 'scratch'),
+        'FILE_CACHE_PATH': str(tmp_path / 'file_cache.db'),
+        'META_CACHE_PATH': str(tmp_path / 'metadata_cache.db'),
+        'USER_DB_PATH': str(tmp_path / 'users.db'),
+        'BROADCAST_DB_PATH': str(tmp_path / 'broadcasts.db'),
+        'RATE_LIMIT_DB_PATH': '',
+        'OVERSIZE_MODE': 'off',
+        'LOCAL_BOT_API_URL': '',
+    }.items():
+        monkeypatch.setattr(Config, name, value)
+    return Config
+
+@pytest.fixture
+def api():
+    server = FakeBotAPI(latency=0).start()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def make_bot():
+    bots = []
+
+    def make():
+        bots.append(ReiAssistantBot())
+        return bots[-1]
+
+    yield make
+    # Background task tidak pernah dimulai, cukup tutup database / pool
+    for rei in bots:
+        asyncio.run(rei.post_shutdown(None))
+        rei.broadcasts.reader.close()
+        rei.broadcasts.conn.close()
+
+def test_local_api_used_when_server_available(config, api, make_bot):
+    config.LOCAL_BOT_API_URL = api.url
+    rei = make_bot()
+
+    assert rei.local_api
+    assert rei.downloader.max_size == config.LOCAL_MAX_FILE_SIZE
+    assert api.calls['getMe'] == 1
+
+def test_falls_back_to_public_api_when_server_down(config, make_bot):
+    # Port dari server yang sudah dimatikan: koneksi ditolak
+    server = FakeBotAPI().start()
+    config.LOCAL_BOT_API_URL = server.url
+    server.stop()
+    rei = make_bot()
+
+    assert not rei.local_api
+    assert rei.downloader.max_size == config.MAX_FILE_SIZE
+
+def test_local_mode_uploads_file_path(config, api, make_bot, tmp_path):
+    config.LOCAL_BOT_API_URL = api.url
+    rei = make_bot()
+    media = tmp_path / 'video [abc].mp4'
+    media.write_bytes(b'\0' * 256 * 1024)
+
+    async def upload():
+        application = (
+            Application.builder().token(TOKEN)
+            .base_url(f"{api.url}/bot").base_file_url(f"{api.url}/file/bot")
+            .local_mode(True).build()
+        )
+        await application.initialize()
+        try:
+            video_file, upload_name, file_size = rei._open_media(str(media))
+            with video_file as video:
+                await application.bot.send_video(chat_id=42, video=video, filename=upload_name)
+        finally:
+            await application.shutdown()
+        return file_size
+
+    file_size = asyncio.run(upload())
+
+    assert file_size == 256 * 1024
+    # Server lokal menerima path file://, bukan isi file
+    assert api.last_params['sendVideo']['video'] == media.absolute().as_uri()
+    assert api.bytes_in < file_size
@@ -0,0 +1,127 @@
+import os
+import glob
+import json
+import math
+import shutil
+import subprocess
+
+try:
+    import resource
+except ImportError:  # Windows: tanpa batas CPU
+    resource = None
+
+# Cadangan untuk overhead container dan bitrate encoder yang meleset
+SIZE_MARGIN = 0.92
+AUDIO_KBPS = 96
+# Di bawah bitrate ini hasil kompres tidak layak ditonton, lebih baik dipotong
+MIN_VIDEO_KBPS = 200
+
+class TranscodeError(Exception):
+    """Video tidak bisa dibuat muat dalam batas ukuran"""
+
+def available():
+    """ffmpeg dan ffprobe terpasang"""
+    return shutil.which('ffmpeg') is not None and shutil.which('ffprobe') is not None
+
+def _cpu_limit(seconds):
+    """preexec_fn untuk membatasi CPU time proses ffmpeg"""
+    if not resource or not seconds:
+        return None
+
+    def apply():
+        resource.setrlimit(resource.RLIMIT_CPU, (seconds, seconds))
+    return apply
+
+def _ffmpeg(args, cpu_limit=0):
+    result = subprocess.run(
+        ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y'] + args,
+        capture_output=True, text=True, preexec_fn=_cpu_limit(cpu_limit)
+    )
+    if result.returncode < 0:
+        # Dihentikan sinyal (SIGXCPU / SIGKILL) karena batas CPU habis
+        raise TranscodeError(f"Konversi dihentikan (batas CPU {cpu_limit} detik)")
+    if result.returncode != 0:
+        raise TranscodeError(result.stderr.strip()[-300:] or f"ffmpeg exit code {result.returncode}")
+
+def probe_duration(path):
+    """Durasi video (detik) dari ffprobe, None jika gagal"""
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'json', path],
+        capture_output=True, text=True
+    )
+    try:
+        return float(json.loads(result.stdout)['format']['duration'])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+def target_bitrate(duration, max_size):
+    """Bitrate video (kbps) agar video + audio hasil encode <= max_size"""
+    total_kbps = max_size * 8 * SIZE_MARGIN / duration / 1000
+    return int(total_kbps - AUDIO_KBPS)
+
+def reencode(path, duration, max_size, output_dir, cpu_limit=0):
+    """Kompres ulang ke H.264 dengan bitrate yang dihitung dari durasi"""
+    video_kbps = target_bitrate(duration, max_size)
+    if video_kbps < MIN_VIDEO_KBPS:
+        raise TranscodeError(f"Video terlalu panjang untuk dikompres ({video_kbps} kbps)")
+
+    # Resolusi diturunkan sesuai bitrate yang tersedia
+    height = 720 if video_kbps >= 1500 else 480 if video_kbps >= 600 else 360
+    name = os.path.splitext(os.path.basename(path))[0]
+    output = os.path.join(output_dir, f"{name} [compressed].mp4")
+    _ffmpeg([
+        '-i', path,
+        '-vf', f"scale=-2:'min({height},ih)'",
+        '-c:v', 'libx264', '-preset', 'veryfast',
+        '-b:v', f'{video_kbps}k', '-maxrate', f'{video_kbps}k', '-bufsize', f'{video_kbps * 2}k',
+        '-c:a', 'aac', '-b:a', f'{AUDIO_KBPS}k',
+        '-movflags', '+faststart',
+        output
+    ], cpu_limit)
+
+    if os.path.getsize(output) > max_size:
+        os.remove(output)
+        raise TranscodeError("Hasil kompres masih melebihi batas ukuran")
+    return [output]
+
+def split(path, duration, max_size, output_dir, cpu_limit=0, attempts=3):
+    """Potong video (tanpa encode ulang) menjadi beberapa part di bawah max_size"""
+    parts = max(2, math.ceil(os.path.getsize(path) / (max_size * SIZE_MARGIN)))
+    pattern = os.path.join(output_dir, 'part_%03d.mp4')
+
+    for _ in range(attempts):
+        for old in glob.glob(os.path.join(output_dir, 'part_*.mp4')):
+            os.remove(old)
+
+        _ffmpeg([
+            '-i', path,
+            '-map', '0:v:0', '-map', '0:a?', '-c', 'copy',
+            '-f', 'segment', '-segment_time', f'{duration / parts:.2f}', '-reset_timestamps', '1',
+            pattern
+        ], cpu_limit)
+
+        outputs = sorted(glob.glob(os.path.join(output_dir, 'part_*.mp4')))
+        if outputs and all(os.path.getsize(output) <= max_size for output in outputs):
+            return outputs
+
+        # Potongan hanya jatuh di keyframe, ukuran bisa meleset: perbanyak part
+        parts += max(1, parts // 2)
+
+    raise TranscodeError("Gagal memotong video di bawah batas ukuran")
+
+def fit_video(path, duration, max_size, output_dir, mode='reencode', cpu_limit=0):
+    """Entry point process pool: buat video muat di max_size.
+
+    Return list path hasil (satu file kompres atau beberapa part).
+    Mode "reencode" otomatis pindah ke split jika kompres tidak memungkinkan.
+    """
+    duration = duration or probe_duration(path)
+    if not duration:
+        raise TranscodeError("Durasi video tidak diketahui")
+
+    if mode == 'reencode':
+        try:
+            return reencode(path, duration, max_size, output_dir, cpu_limit)
+        except TranscodeError:
+            pass
+    return split(path, duration, max_size, output_dir, cpu_limit)
@@ -0,0 +1,139 @@
+import re
+from collections import namedtuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Parameter query yang hanya untuk tracking / share, tidak mengubah video
+TRACKING_PARAMS = {
+    'si', 'feature', 'pp', 'igshid', 'igsh', 'fbclid', 'gclid', 'mibextid',
+    'ref', 'ref_src', 'ref_url', 's', 'is_from_webapp', 'sender_device',
+    'sender_web_id', 'is_copy_url', 'web_id', '_r', '_t', 'rdid', 'share_app_id',
+}
+
+# Prefix host versi mobile / www yang menunjuk ke konten yang sama
+HOST_PREFIXES = ('www.', 'm.', 'mobile.', 'vm.', 'vt.')
+
+# Platform per hostname (setelah prefix www. / m. dibuang)
+PLATFORM_HOSTS = {
+    'youtube.com': 'youtube',
+    'youtu.be': 'youtube',
+    'music.youtube.com': 'youtube',
+    'tiktok.com': 'tiktok',
+    'instagram.com': 'instagram',
+    'instagr.am': 'instagram',
+    'facebook.com': 'facebook',
+    'fb.watch': 'facebook',
+    'fb.com': 'facebook',
+    'twitter.com': 'twitter',
+    'x.com': 'twitter',
+}
+
+# URL dengan skema, atau tanpa skema tapi punya host + path (misal youtu.be/abc)
+URL_PATTERN = re.compile(
+    r'(?:https?://[^\s<>"\'`]+'
+    r'|\b(?:[a-z0-9-]+\.)+[a-z]{2,}/[^\s<>"\'`]*)',
+    re.IGNORECASE
+)
+
+# Tanda baca di akhir kalimat yang ikut tertangkap regex
+TRAILING_PUNCTUATION = '.,!?;:)]}\'"'
+
+VideoLink = namedtuple('VideoLink', ('url', 'key', 'platform'))
+
+def _strip_prefix(host):
+    for prefix in HOST_PREFIXES:
+        if host.startswith(prefix):
+            return host[len(prefix):]
+    return host
+
+def get_platform(url):
+    """Platform dari hostname URL (satu lookup dict per level domain), 'unknown' jika tidak dikenal"""
+    if '://' not in url:
+        url = 'https://' + url
+    host = _strip_prefix((urlsplit(url).hostname or '').lower())
+
+    # Subdomain lain (web.facebook.com, music.youtube.com) dicek ke domain induknya
+    while host:
+        platform = PLATFORM_HOSTS.get(host)
+        if platform:
+            return platform
+        host = host.partition('.')[2]
+    return 'unknown'
+
+def normalize_url(url):
+    """Normalisasi URL untuk dipakai sebagai key cache"""
+    url = url.strip()
+    if '://' not in url:
+        url = 'https://' + url
+
+    parts = urlsplit(url)
+    host = _strip_prefix((parts.hostname or '').lower())
+
+    path = parts.path.rstrip('/')
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key not in TRACKING_PARAMS and not key.startswith('utm_')
+    ]
+
+    # youtu.be/<id> dan /shorts/<id> adalah video yang sama dengan watch?v=<id>
+    if host == 'youtu.be' and path:
+        host, query = 'youtube.com', [('v', path.lstrip('/'))] + query
+        path = '/watch'
+    elif host == 'youtube.com' and path.startswith('/shorts/'):
+        query = [('v', path[len('/shorts/'):])] + query
+        path = '/watch'
+
+    if parts.port:
+        host = f"{host}:{parts.port}"
+
+    return urlunsplit(('https', host, path, urlencode(sorted(query)), ''))
+
+def extract_urls(text):
+    """Semua URL dalam teks sesuai urutan, tanpa duplikat (dibandingkan setelah normalisasi)"""
+    urls, seen = [], set()
+    for match in URL_PATTERN.finditer(text):
+        url = match.group(0).rstrip(TRAILING_PUNCTUATION)
+        if '://' not in url:
+            url = 'https://' + url
+        key = normalize_url(url)
+        if key not in seen:
+            seen.add(key)
+            urls.append(url)
+    return urls
+
+def make_link(url):
+    """VideoLink dari satu URL"""
+    return VideoLink(url, normalize_url(url), get_platform(url))
+
+def is_collection(url):
+    """Link playlist / channel / profil (berisi banyak video), bukan satu video"""
+    parts = urlsplit(url if '://' in url else 'https://' + url)
+    path = parts.path
+    platform = get_platform(url)
+
+    if platform == 'youtube':
+        query = dict(parse_qsl(parts.query))
+        return (
+            path.startswith(('/playlist', '/@', '/channel/', '/c/', '/user/'))
+            or ('list' in query and 'v' not in query)
+        )
+    if platform == 'tiktok':
+        return path.startswith('/@') and '/video/' not in path and '/photo/' not in path
+    return False
+
+def parse_links(text, allow_unknown=False):
+    """Link video dari pesan user sebagai list VideoLink(url, key, platform).
+
+    Host yang tidak dikenal (kecuali allow_unknown) dan URL tanpa path
+    (misal halaman utama youtube.com) diabaikan, sehingga pesan tanpa
+    link video sudah ditolak sebelum yt-dlp dipanggil.
+    """
+    links = []
+    for url in extract_urls(text):
+        parts = urlsplit(url)
+        if parts.path.strip('/') == '' and not parts.query:
+            continue
+        platform = get_platform(url)
+        if platform == 'unknown' and not allow_unknown:
+            continue
+        links.append(make_link(url))
+    return links
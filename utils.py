@@ -1,60 +1,239 @@
 import logging
+import logging.handlers
 import os
+import re
 import sys
+import json
+import queue
+import atexit
+import threading
 from datetime import datetime
 
-class CustomFormatter(logging.Formatter):
-    """Custom formatter untuk menyembunyikan informasi sensitif"""
+logger = logging.getLogger(__name__)
+
+# Logger khusus activity log Rei Assistant
+activity_logger = logging.getLogger('rei.activity')
+
+_log_writer = None
+
+class Redactor:
+    """Redaksi secret dalam teks log dengan satu regex yang dikompilasi sekali"""
     
-    def format(self, record):
-        # Sembunyikan API keys dari log
-        msg = super().format(record)
+    # Kata kunci yang nilainya disembunyikan (misal token=xxx, password: xxx)
+    SENSITIVE_KEYWORDS = ('bot_token', 'api_key', 'token', 'secret', 'password')
+    
+    # Bentuk token bot Telegram: <bot id>:<35 karakter>
+    TOKEN_PATTERN = r'(?<![0-9])[0-9]{6,12}:[A-Za-z0-9_-]{30,}'
+    
+    def __init__(self, secrets=()):
+        secrets = sorted({s for s in secrets if s}, key=len, reverse=True)
+        
+        # Satu regex untuk nilai secret yang dikonfigurasi + string berbentuk token
+        alternatives = [re.escape(secret) for secret in secrets]
+        alternatives.append(self.TOKEN_PATTERN)
+        self.pattern = re.compile('|'.join(alternatives))
         
-        # Filter kata-kata sensitif
-        sensitive_keywords = [
-            'bot_token', 'api_key', 'token', 'secret', 
-            'password', 'BOT_TOKEN', 'API_KEY'
-        ]
+        # Regex key=value hanya dijalankan jika kata kunci memang muncul
+        self.keyword_pattern = re.compile(
+            r'(?P<key>\b(?:' + '|'.join(self.SENSITIVE_KEYWORDS) + r')\b)'
+            r'(?P<sep>["\']?\s*[=:]\s*["\']?)[^\s"\'&,;]+',
+            re.IGNORECASE
+        )
         
-        for keyword in sensitive_keywords:
-            if keyword in msg.lower():
-                msg = msg.replace(keyword, '[REDACTED]')
+        # Pengecekan murah sebelum regex dijalankan
+        self._secrets = tuple(secrets)
+        self._token_probe = re.compile(r':[A-Za-z0-9_-]{30,}')
+        self._keywords = tuple(k for k in self.SENSITIVE_KEYWORDS if k != 'bot_token')
+    
+    def redact(self, text):
+        """Sembunyikan secret dalam teks"""
+        # Fast path: token selalu berisi ':' dan key=value butuh '=' / ':',
+        # regex probe dan lower() hanya dijalankan jika cek substring ini kena
+        has_colon = ':' in text
+        if has_colon and self._token_probe.search(text):
+            text = self.pattern.sub('[REDACTED]', text)
+        else:
+            for secret in self._secrets:
+                if secret in text:
+                    text = self.pattern.sub('[REDACTED]', text)
+                    break
         
-        return msg
+        if has_colon or '=' in text:
+            lowered = text.lower()
+            for keyword in self._keywords:
+                if keyword in lowered:
+                    return self.keyword_pattern.sub(r'\g<key>\g<sep>[REDACTED]', text)
+        return text
 
-def setup_logger():
-    """Setup logger dengan custom formatter"""
+class CustomFormatter(logging.Formatter):
+    """Custom formatter untuk menyembunyikan informasi sensitif"""
     
-    # Buat logs directory jika belum ada
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
+    def __init__(self, fmt=None, datefmt=None, secrets=()):
+        super().__init__(fmt, datefmt)
+        self.redactor = Redactor(secrets)
+    
+    def formatMessage(self, record):
+        # Hanya isi pesan yang diredaksi, bukan timestamp / nama logger
+        record.message = self.redactor.redact(record.message)
+        return super().formatMessage(record)
+    
+    def formatException(self, ei):
+        return self.redactor.redact(super().formatException(ei))
+
+class DailyFileHandler(logging.Handler):
+    """Handler file yang tetap terbuka dan otomatis ganti file saat ganti hari"""
+    
+    def __init__(self, pattern, level=logging.NOTSET):
+        super().__init__(level)
+        self.pattern = pattern
+        self._day = None
+        self._stream = None
+    
+    def _rotate(self, day):
+        if self._stream:
+            self._stream.close()
+        self._day = day
+        self._stream = open(self.pattern.format(date=day), 'a', encoding='utf-8')
+    
+    def emit(self, record):
+        try:
+            day = datetime.fromtimestamp(record.created).strftime("%Y%m%d")
+            if day != self._day:
+                self._rotate(day)
+            # Tidak flush per record, flush dilakukan per batch oleh writer
+            self._stream.write(self.format(record) + "\n")
+        except Exception:
+            self.handleError(record)
+    
+    def flush(self):
+        if self._stream:
+            self._stream.flush()
+    
+    def close(self):
+        if self._stream:
+            self._stream.close()
+            self._stream = None
+        super().close()
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formatter JSON per baris untuk analisa activity log secara offline"""
+    
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='seconds'),
+            'level': record.levelname,
+        }
+        entry.update(getattr(record, 'activity', None) or {'message': record.getMessage()})
+        return json.dumps(entry, ensure_ascii=False)
+
+class BatchLogWriter:
+    """Background writer: ambil record dari queue lalu tulis ke handler per batch"""
+    
+    def __init__(self, handlers, batch_size=500, flush_interval=1.0):
+        self.queue = queue.SimpleQueue()
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._stop = object()
+        self._thread = threading.Thread(target=self._run, name='rei-log-writer', daemon=True)
+    
+    def start(self):
+        self._thread.start()
+    
+    def stop(self):
+        """Tulis sisa record di queue lalu tutup semua handler"""
+        if self._thread.is_alive():
+            self.queue.put(self._stop)
+            self._thread.join()
+        for handler in self.handlers:
+            handler.close()
+    
+    def _write(self, batch):
+        for record in batch:
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+        for handler in self.handlers:
+            handler.flush()
+    
+    def _run(self):
+        while True:
+            try:
+                record = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            
+            batch = []
+            stopping = record is self._stop
+            if not stopping:
+                batch.append(record)
+            
+            # Ambil semua record yang sudah menunggu, maksimal batch_size
+            while not stopping and len(batch) < self.batch_size:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is self._stop:
+                    stopping = True
+                else:
+                    batch.append(record)
+            
+            if batch:
+                self._write(batch)
+            if stopping:
+                return
+
+def setup_logger(json_activity=False, secrets=()):
+    """Setup logger dengan custom formatter, semua handler lewat queue non-blocking"""
+    global _log_writer
     
     # Setup logger
     logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
+    if _log_writer is not None:
+        return logger
     
-    # Handler untuk file
-    file_handler = logging.FileHandler(
-        f'logs/bot_{datetime.now().strftime("%Y%m%d")}.log',
-        encoding='utf-8'
-    )
-    file_handler.setLevel(logging.INFO)
+    # Buat logs directory jika belum ada
+    if not os.path.exists('logs'):
+        os.makedirs('logs')
     
-    # Handler untuk console (tanpa info sensitif)
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.INFO)
+    logger.setLevel(logging.INFO)
     
     # Custom formatter
     formatter = CustomFormatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
+        datefmt='%Y-%m-%d %H:%M:%S',
+        secrets=secrets
     )
     
+    # Handler untuk file (ganti file tiap hari)
+    file_handler = DailyFileHandler('logs/bot_{date}.log', logging.INFO)
     file_handler.setFormatter(formatter)
+    
+    # Handler untuk console (tanpa info sensitif)
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(formatter)
     
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    # Handler untuk activity log (format pipe seperti sebelumnya)
+    activity_handler = DailyFileHandler('logs/rei_activity_{date}.log', logging.INFO)
+    activity_handler.addFilter(logging.Filter(activity_logger.name))
+    activity_handler.setFormatter(logging.Formatter('%(message)s'))
+    
+    handlers = [file_handler, console_handler, activity_handler]
+    
+    # Output JSON lines opsional untuk analisa offline
+    if json_activity:
+        json_handler = DailyFileHandler('logs/rei_activity_{date}.jsonl', logging.INFO)
+        json_handler.addFilter(logging.Filter(activity_logger.name))
+        json_handler.setFormatter(JsonLinesFormatter())
+        handlers.append(json_handler)
+    
+    _log_writer = BatchLogWriter(handlers)
+    _log_writer.start()
+    atexit.register(_log_writer.stop)
+    
+    logger.addHandler(logging.handlers.QueueHandler(_log_writer.queue))
     
     return logger
 
@@ -85,9 +264,11 @@ def log_rei_activity(user_id, username, action, platform=None, details=""):
         f"DETAILS:{details[:100]}"
     )
     
-    # Log ke file
-    with open(f'logs/rei_activity_{datetime.now().strftime("%Y%m%d")}.log', 'a', encoding='utf-8') as f:
-        f.write(log_entry + "\n")
-    
-    # Juga log ke console dengan level INFO
-    logger.info(log_entry)
\ No newline at end of file
+    # Masuk queue logging (file activity, console, JSON lines), tidak blocking
+    activity_logger.info(log_entry, extra={'activity': {
+        'user_id': user_id,
+        'username': username,
+        'action': action,
+        'platform': platform,
+        'details': details[:100]
+    }})
\ No newline at end of file